@@ -0,0 +1,55 @@
+"""Add is_latest pointer to ReviewHistory
+
+Revision ID: 7c1e9a4b2d10
+Revises: 543a86301c64
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e9a4b2d10'
+down_revision: Union[str, None] = '543a86301c64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'ReviewHistory',
+        sa.Column('is_latest', sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+    op.create_index('ix_ReviewHistory_review_id_is_latest', 'ReviewHistory', ['review_id', 'is_latest'], unique=False)
+    op.create_index('ix_ReviewHistory_category_id_is_latest', 'ReviewHistory', ['category_id', 'is_latest'], unique=False)
+
+    # Backfilling the pointer: the newest version (by created_at, then id) of each review_id is the latest
+    history = sa.table(
+        'ReviewHistory',
+        sa.column('id', sa.Integer),
+        sa.column('review_id', sa.String),
+        sa.column('created_at', sa.DateTime),
+        sa.column('is_latest', sa.Boolean),
+    )
+    ranked = sa.select(
+        history.c.id,
+        sa.func.row_number().over(
+            partition_by=history.c.review_id,
+            order_by=(history.c.created_at.desc(), history.c.id.desc()),
+        ).label('rn'),
+    ).subquery()
+    op.execute(
+        history.update()
+        .where(history.c.id.in_(sa.select(ranked.c.id).where(ranked.c.rn == 1)))
+        .values(is_latest=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ReviewHistory_category_id_is_latest', table_name='ReviewHistory')
+    op.drop_index('ix_ReviewHistory_review_id_is_latest', table_name='ReviewHistory')
+    with op.batch_alter_table('ReviewHistory') as batch_op:
+        batch_op.drop_column('is_latest')
@@ -0,0 +1,49 @@
+"""Add CategoryTrendBucket rollups
+
+Revision ID: a8e4c2f07b93
+Revises: f3c7d1a9e820
+Create Date: 2026-10-17 16:41:09.273518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e4c2f07b93'
+down_revision: Union[str, None] = 'f3c7d1a9e820'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('CategoryTrendBucket',
+    sa.Column('granularity', sa.String(length=8), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.Date(), nullable=False),
+    sa.Column('stars_sum', sa.Integer(), nullable=False),
+    sa.Column('rating_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['Category.id'], ),
+    sa.PrimaryKeyConstraint('granularity', 'category_id', 'bucket_start')
+    )
+
+    # Existing versions start out not rolled up; they are picked up by the rollup task,
+    # or all at once with `python -m app.cli trends backfill`
+    op.add_column(
+        'ReviewHistory',
+        sa.Column('rolled_up', sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+    op.create_index(
+        'ix_ReviewHistory_not_rolled_up', 'ReviewHistory', ['id'], unique=False,
+        sqlite_where=sa.text('rolled_up = 0'),
+        postgresql_where=sa.text('rolled_up = false'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ReviewHistory_not_rolled_up', table_name='ReviewHistory')
+    with op.batch_alter_table('ReviewHistory') as batch_op:
+        batch_op.drop_column('rolled_up')
+    op.drop_table('CategoryTrendBucket')
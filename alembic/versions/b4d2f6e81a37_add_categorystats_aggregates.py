@@ -0,0 +1,64 @@
+"""Add CategoryStats aggregates
+
+Revision ID: b4d2f6e81a37
+Revises: 7c1e9a4b2d10
+Create Date: 2026-10-17 10:03:27.551930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d2f6e81a37'
+down_revision: Union[str, None] = '7c1e9a4b2d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('CategoryStats',
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('stars_sum', sa.Integer(), nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('average_stars', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['Category.id'], ),
+    sa.PrimaryKeyConstraint('category_id')
+    )
+    op.create_index('ix_CategoryStats_average_stars', 'CategoryStats', ['average_stars'], unique=False)
+
+    # Backfilling the aggregates from the latest version of every review
+    history = sa.table(
+        'ReviewHistory',
+        sa.column('id', sa.Integer),
+        sa.column('stars', sa.Integer),
+        sa.column('category_id', sa.Integer),
+        sa.column('is_latest', sa.Boolean),
+    )
+    stats = sa.table(
+        'CategoryStats',
+        sa.column('category_id', sa.Integer),
+        sa.column('stars_sum', sa.Integer),
+        sa.column('review_count', sa.Integer),
+        sa.column('average_stars', sa.Float),
+    )
+    op.execute(
+        stats.insert().from_select(
+            ['category_id', 'stars_sum', 'review_count', 'average_stars'],
+            sa.select(
+                history.c.category_id,
+                sa.func.sum(history.c.stars),
+                sa.func.count(history.c.id),
+                sa.func.avg(sa.cast(history.c.stars, sa.Float)),
+            )
+            .where(history.c.is_latest == sa.true(), history.c.category_id.is_not(None))
+            .group_by(history.c.category_id),
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_CategoryStats_average_stars', table_name='CategoryStats')
+    op.drop_table('CategoryStats')
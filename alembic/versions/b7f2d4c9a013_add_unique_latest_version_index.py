@@ -0,0 +1,53 @@
+"""Add unique index over the latest version of each review
+
+Revision ID: b7f2d4c9a013
+Revises: d6a1e3b8f274
+Create Date: 2026-10-17 21:48:19.604127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f2d4c9a013'
+down_revision: Union[str, None] = 'd6a1e3b8f274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Demoting all but the newest latest row of reviews left with several by concurrent writers,
+    # so the index can be built. Such reviews were counted more than once in CategoryStats:
+    # run `python -m app.cli stats verify` (and `stats rebuild`) after upgrading.
+    history = sa.table(
+        'ReviewHistory',
+        sa.column('id', sa.Integer),
+        sa.column('review_id', sa.String),
+        sa.column('created_at', sa.DateTime),
+        sa.column('is_latest', sa.Boolean),
+    )
+    ranked = sa.select(
+        history.c.id,
+        sa.func.row_number().over(
+            partition_by=history.c.review_id,
+            order_by=(history.c.created_at.desc(), history.c.id.desc()),
+        ).label('rn'),
+    ).where(history.c.is_latest == sa.true()).subquery()
+    op.execute(
+        history.update()
+        .where(history.c.id.in_(sa.select(ranked.c.id).where(ranked.c.rn > 1)))
+        .values(is_latest=False)
+    )
+
+    op.create_index(
+        'ix_ReviewHistory_latest_review_id', 'ReviewHistory', ['review_id'], unique=True,
+        sqlite_where=sa.text('is_latest = 1'),
+        postgresql_where=sa.text('is_latest'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ReviewHistory_latest_review_id', table_name='ReviewHistory')
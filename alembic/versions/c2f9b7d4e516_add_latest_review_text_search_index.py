@@ -0,0 +1,56 @@
+"""Add full-text search index over latest review text
+
+Revision ID: c2f9b7d4e516
+Revises: a8e4c2f07b93
+Create Date: 2026-10-17 18:12:45.601337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f9b7d4e516'
+down_revision: Union[str, None] = 'a8e4c2f07b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # FTS5 table over the latest versions, kept in sync by triggers
+        op.execute("""CREATE VIRTUAL TABLE "ReviewSearch" USING fts5(text, tokenize = 'porter unicode61')""")
+        op.execute("""CREATE TRIGGER "ReviewSearch_insert" AFTER INSERT ON "ReviewHistory"
+        WHEN new.is_latest BEGIN
+            INSERT INTO "ReviewSearch" (rowid, text) VALUES (new.id, new.text);
+        END""")
+        op.execute("""CREATE TRIGGER "ReviewSearch_update" AFTER UPDATE OF is_latest, text ON "ReviewHistory"
+        WHEN old.is_latest OR new.is_latest BEGIN
+            DELETE FROM "ReviewSearch" WHERE rowid = old.id;
+            INSERT INTO "ReviewSearch" (rowid, text) SELECT new.id, new.text WHERE new.is_latest;
+        END""")
+        op.execute("""CREATE TRIGGER "ReviewSearch_delete" AFTER DELETE ON "ReviewHistory"
+        WHEN old.is_latest BEGIN
+            DELETE FROM "ReviewSearch" WHERE rowid = old.id;
+        END""")
+
+        # Indexing the current latest versions
+        op.execute("""INSERT INTO "ReviewSearch" (rowid, text) SELECT id, text FROM "ReviewHistory" WHERE is_latest""")
+    elif dialect == 'postgresql':
+        # Partial GIN expression index; search queries repeat the same expression
+        op.execute("""CREATE INDEX "ix_ReviewHistory_latest_text_search" ON "ReviewHistory"
+        USING gin (to_tsvector('english'::regconfig, coalesce(text, ''))) WHERE is_latest""")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER "ReviewSearch_delete"')
+        op.execute('DROP TRIGGER "ReviewSearch_update"')
+        op.execute('DROP TRIGGER "ReviewSearch_insert"')
+        op.execute('DROP TABLE "ReviewSearch"')
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX "ix_ReviewHistory_latest_text_search"')
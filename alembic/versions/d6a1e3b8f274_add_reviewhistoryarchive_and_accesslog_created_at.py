@@ -0,0 +1,51 @@
+"""Add ReviewHistoryArchive and AccessLog.created_at
+
+Revision ID: d6a1e3b8f274
+Revises: c2f9b7d4e516
+Create Date: 2026-10-17 19:27:51.118064
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6a1e3b8f274'
+down_revision: Union[str, None] = 'c2f9b7d4e516'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ReviewHistoryArchive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('text', sa.String(), nullable=True),
+    sa.Column('stars', sa.Integer(), nullable=False),
+    sa.Column('review_id', sa.String(length=255), nullable=False),
+    sa.Column('tone', sa.String(length=255), nullable=True),
+    sa.Column('sentiment', sa.String(length=255), nullable=True),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['category_id'], ['Category.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ReviewHistoryArchive_review_id_created_at', 'ReviewHistoryArchive', ['review_id', 'created_at'], unique=False)
+
+    op.add_column('AccessLog', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_AccessLog_created_at', 'AccessLog', ['created_at'], unique=False)
+
+    # Existing entries start their retention period now
+    access_log = sa.table('AccessLog', sa.column('created_at', sa.DateTime))
+    op.execute(access_log.update().values(created_at=sa.func.now()))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_AccessLog_created_at', table_name='AccessLog')
+    with op.batch_alter_table('AccessLog') as batch_op:
+        batch_op.drop_column('created_at')
+    op.drop_index('ix_ReviewHistoryArchive_review_id_created_at', table_name='ReviewHistoryArchive')
+    op.drop_table('ReviewHistoryArchive')
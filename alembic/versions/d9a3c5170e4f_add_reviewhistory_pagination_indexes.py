@@ -0,0 +1,31 @@
+"""Add ReviewHistory pagination indexes
+
+Revision ID: d9a3c5170e4f
+Revises: b4d2f6e81a37
+Create Date: 2026-10-17 11:20:05.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a3c5170e4f'
+down_revision: Union[str, None] = 'b4d2f6e81a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_ReviewHistory_review_id_created_at', 'ReviewHistory', ['review_id', 'created_at'], unique=False)
+    # Superseded by the wider keyset index below, which has the same leading columns
+    op.drop_index('ix_ReviewHistory_category_id_is_latest', table_name='ReviewHistory')
+    op.create_index('ix_ReviewHistory_category_latest_created_at_id', 'ReviewHistory', ['category_id', 'is_latest', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ReviewHistory_category_latest_created_at_id', table_name='ReviewHistory')
+    op.create_index('ix_ReviewHistory_category_id_is_latest', 'ReviewHistory', ['category_id', 'is_latest'], unique=False)
+    op.drop_index('ix_ReviewHistory_review_id_created_at', table_name='ReviewHistory')
@@ -0,0 +1,31 @@
+"""Add partial index over unenriched ReviewHistory versions
+
+Revision ID: f3c7d1a9e820
+Revises: e5b8a2c94d61
+Create Date: 2026-10-17 15:02:37.480215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c7d1a9e820'
+down_revision: Union[str, None] = 'e5b8a2c94d61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Only latest versions missing tone and/or sentiment are indexed, for the enrichment scheduler
+    op.create_index(
+        'ix_ReviewHistory_unenriched', 'ReviewHistory', ['category_id', 'created_at'], unique=False,
+        sqlite_where=sa.text('is_latest = 1 AND (tone IS NULL OR sentiment IS NULL)'),
+        postgresql_where=sa.text('is_latest AND (tone IS NULL OR sentiment IS NULL)'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ReviewHistory_unenriched', table_name='ReviewHistory')
@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+from sqlalchemy import insert
+from .database import SessionLocal
+from .models import AccessLog
+
+logger = logging.getLogger(__name__)
+
+# Entries are written when this many are buffered, or at least every ACCESS_LOG_FLUSH_INTERVAL seconds
+ACCESS_LOG_BATCH_SIZE = int(os.getenv("ACCESS_LOG_BATCH_SIZE", "500"))
+ACCESS_LOG_FLUSH_INTERVAL = float(os.getenv("ACCESS_LOG_FLUSH_INTERVAL", "1.0"))
+# Upper bound on buffered entries if the database is unavailable; the oldest entries are dropped beyond it
+ACCESS_LOG_MAX_BUFFER = int(os.getenv("ACCESS_LOG_MAX_BUFFER", "50000"))
+
+
+class AccessLogBuffer:
+    """
+    Buffers access log entries in process and writes them with one bulk insert per flush.
+
+    Logging an access is a list append in the request path. A background thread flushes the
+    buffer when `batch_size` entries are pending or every `flush_interval` seconds, and `close()`
+    writes whatever is left on shutdown.
+
+    Attributes:
+        batch_size (int): Number of buffered entries that triggers an immediate flush.
+        flush_interval (float): Maximum seconds an entry waits before being written.
+        max_buffer (int): Maximum number of entries kept while writes are failing.
+    """
+
+    def __init__(self, batch_size: int = ACCESS_LOG_BATCH_SIZE, flush_interval: float = ACCESS_LOG_FLUSH_INTERVAL,
+                 max_buffer: int = ACCESS_LOG_MAX_BUFFER):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._entries = []
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def add(self, log_text: str):
+        """
+        Buffers one access log entry.
+
+        Args:
+            log_text (str): The access log message to save.
+        """
+        with self._lock:
+            self._entries.append(log_text)
+            if len(self._entries) > self.max_buffer:
+                del self._entries[: len(self._entries) - self.max_buffer]
+            full = len(self._entries) >= self.batch_size
+            if self._thread is None:
+                # The flusher only starts in processes that actually log (not in Celery workers)
+                self._thread = threading.Thread(target=self._run, name="access-log-flusher", daemon=True)
+                self._thread.start()
+
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Writes every buffered entry in a single transaction.
+
+        Returns:
+            int: Number of entries written.
+        """
+        with self._lock:
+            entries, self._entries = self._entries, []
+
+        if not entries:
+            return 0
+
+        db = SessionLocal()
+        try:
+            db.execute(insert(AccessLog), [{"text": text} for text in entries])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.exception("Error flushing access logs: %s", e)
+            # Keeping the entries for the next attempt
+            with self._lock:
+                self._entries[:0] = entries
+                if len(self._entries) > self.max_buffer:
+                    del self._entries[: len(self._entries) - self.max_buffer]
+            return 0
+        finally:
+            db.close()
+
+        return len(entries)
+
+    def close(self):
+        """
+        Stops the background flusher and writes the remaining entries.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+# Buffer used by the API process
+access_log_buffer = AccessLogBuffer()
@@ -0,0 +1,122 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import delete, false, insert, select, true, union_all
+from sqlalchemy.orm import Session
+from .models import AccessLog, ReviewHistory, ReviewHistoryArchive
+
+# Superseded versions older than this many days are moved to ReviewHistoryArchive
+HISTORY_ARCHIVE_AFTER_DAYS = float(os.getenv("HISTORY_ARCHIVE_AFTER_DAYS", "90"))
+# Access log entries older than this many days are deleted
+ACCESS_LOG_RETENTION_DAYS = float(os.getenv("ACCESS_LOG_RETENTION_DAYS", "30"))
+# Rows moved or deleted per transaction
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+
+# Columns copied from ReviewHistory to ReviewHistoryArchive
+ARCHIVED_COLUMNS = ["id", "text", "stars", "review_id", "tone", "sentiment", "category_id", "created_at", "updated_at"]
+
+
+def archive_superseded_versions(
+    session: Session,
+    older_than_days: float = HISTORY_ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> int:
+    """
+    Moves superseded review versions older than `older_than_days` from ReviewHistory to
+    ReviewHistoryArchive, committing after each batch.
+
+    - Latest versions are never moved, so ReviewHistory keeps every current version plus the
+      versions created within the window. A superseded version never becomes latest again,
+      and its removal changes neither CategoryStats, the search index nor any cached response.
+    - Versions not yet counted in the trend rollups are left for a later run, so the trend
+      history keeps covering archived versions.
+    - Each batch is copied and deleted in one transaction, walking ReviewHistory by id.
+
+    Args:
+        session (Session): Database session.
+        older_than_days (float): Minimum age of the versions to archive, by `created_at`.
+        batch_size (int): Versions per transaction.
+
+    Returns:
+        int: Number of versions archived.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    columns = [getattr(ReviewHistory, name) for name in ARCHIVED_COLUMNS]
+    archived, last_id = 0, 0
+    while True:
+        ids = session.execute(
+            select(ReviewHistory.id)
+            .where(
+                ReviewHistory.id > last_id,
+                ReviewHistory.is_latest == false(),
+                ReviewHistory.rolled_up == true(),
+                ReviewHistory.created_at < cutoff,
+            )
+            .order_by(ReviewHistory.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return archived
+
+        session.execute(
+            insert(ReviewHistoryArchive).from_select(
+                ARCHIVED_COLUMNS, select(*columns).where(ReviewHistory.id.in_(ids))
+            )
+        )
+        session.execute(delete(ReviewHistory).where(ReviewHistory.id.in_(ids)))
+        session.commit()
+        archived += len(ids)
+        last_id = ids[-1]
+
+
+def purge_access_logs(
+    session: Session,
+    older_than_days: float = ACCESS_LOG_RETENTION_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> int:
+    """
+    Deletes access log entries older than `older_than_days`, committing after each batch.
+
+    Args:
+        session (Session): Database session.
+        older_than_days (float): Retention period.
+        batch_size (int): Entries deleted per transaction.
+
+    Returns:
+        int: Number of entries deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    deleted = 0
+    while True:
+        ids = session.execute(
+            select(AccessLog.id).where(AccessLog.created_at < cutoff).order_by(AccessLog.created_at).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return deleted
+
+        session.execute(delete(AccessLog).where(AccessLog.id.in_(ids)))
+        session.commit()
+        deleted += len(ids)
+
+
+def review_versions_query(review_id: str, columns: list):
+    """
+    Builds the query for every version of a review, from ReviewHistory and the archive, oldest first.
+
+    Args:
+        review_id (str): The review to read.
+        columns (list): ReviewHistory columns to select (archived rows have the same columns).
+
+    Returns:
+        Select: The query, with `is_latest` and `archived` flags after the requested columns.
+    """
+    current = select(
+        *columns, ReviewHistory.is_latest.label("is_latest"), false().label("archived")
+    ).where(ReviewHistory.review_id == review_id)
+    archived = select(
+        *[getattr(ReviewHistoryArchive, column.key) for column in columns],
+        false().label("is_latest"),
+        true().label("archived"),
+    ).where(ReviewHistoryArchive.review_id == review_id)
+
+    versions = union_all(current, archived).subquery()
+    return select(versions).order_by(versions.c.created_at, versions.c.id)
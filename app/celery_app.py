@@ -0,0 +1,74 @@
+import os
+from celery import Celery
+from .pending import REDIS_URL
+from .task_signatures import (
+    ARCHIVE_HISTORY_TASK, DEFAULT_QUEUE, EVICT_PREDICTIONS_TASK, PRIORITY_DEFAULT, PRIORITY_SEPARATOR, PRIORITY_STEPS,
+    ROLLUP_TRENDS_TASK, SCHEDULE_ENRICHMENT_TASK, TASK_QUEUES,
+)
+
+# Broker and result backend; default to REDIS_URL. The broker can be pointed elsewhere (e.g. a
+# local Redis stand-in) without moving the claims, metrics and caches kept in REDIS_URL
+# (the celery_queue_length metric only reads queues on REDIS_URL).
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
+# Seconds after which a message taken but not acknowledged (late ack) is delivered again;
+# must exceed the longest task, including the countdown of delayed retries
+CELERY_VISIBILITY_TIMEOUT = int(os.getenv("CELERY_VISIBILITY_TIMEOUT", "3600"))
+
+# Seconds between enrichment scheduler runs (Celery beat)
+ENRICHMENT_SCHEDULE_INTERVAL = float(os.getenv("ENRICHMENT_SCHEDULE_INTERVAL", "30"))
+# Seconds between trend rollup runs (Celery beat); bounds how stale the trend history can be
+TREND_ROLLUP_INTERVAL = float(os.getenv("TREND_ROLLUP_INTERVAL", "60"))
+# Seconds between history archival and access log retention runs (Celery beat)
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "86400"))
+# Seconds between prediction cache evictions (Celery beat)
+PREDICTION_CACHE_EVICT_INTERVAL = float(os.getenv("PREDICTION_CACHE_EVICT_INTERVAL", "300"))
+
+# Celery configuration
+# The task modules (and with them the LLM client) are only imported by worker and beat processes;
+# producers send tasks by name through app.task_signatures.
+celery = Celery(
+    "tasks",
+    broker=CELERY_BROKER_URL, # Redis as the message broker
+    backend=CELERY_RESULT_BACKEND, #Redis as the result backend
+    include=["app.celery_tasks"],
+)
+
+celery.conf.update(
+    # Every kind of work has its own queue, so a backlog of slow LLM tasks never delays the
+    # periodic jobs (see app.celery_worker for the worker pools)
+    task_routes={name: {"queue": queue} for name, queue in TASK_QUEUES.items()},
+    task_default_queue=DEFAULT_QUEUE,
+    # Priorities within a queue: lower values are consumed first
+    task_default_priority=PRIORITY_DEFAULT,
+    broker_transport_options={
+        "priority_steps": PRIORITY_STEPS,
+        "sep": PRIORITY_SEPARATOR,
+        # A worker consuming several queues serves them in the order given with -Q
+        "queue_order_strategy": "priority",
+        "visibility_timeout": CELERY_VISIBILITY_TIMEOUT,
+    },
+    # One reserved message per worker process unless a pool asks for more, so slow tasks are
+    # not hoarded by busy processes while others sit idle
+    worker_prefetch_multiplier=1,
+)
+
+# Periodic schedule picked up by `celery beat`
+celery.conf.beat_schedule = {
+    "schedule-enrichment": {
+        "task": SCHEDULE_ENRICHMENT_TASK,
+        "schedule": ENRICHMENT_SCHEDULE_INTERVAL,
+    },
+    "rollup-trends": {
+        "task": ROLLUP_TRENDS_TASK,
+        "schedule": TREND_ROLLUP_INTERVAL,
+    },
+    "archive-history": {
+        "task": ARCHIVE_HISTORY_TASK,
+        "schedule": ARCHIVE_INTERVAL,
+    },
+    "evict-prediction-cache": {
+        "task": EVICT_PREDICTIONS_TASK,
+        "schedule": PREDICTION_CACHE_EVICT_INTERVAL,
+    },
+}
@@ -1,56 +1,87 @@
-from celery import Celery
+import logging
+import os
+import random
+import time
+from celery.signals import task_postrun, task_prerun, worker_process_shutdown
+from .celery_app import celery
+from .archival import archive_superseded_versions, purge_access_logs
+from .circuit_breaker import llm_circuit
+from .classifiers import LLMClassifier, classifier
 from .database import SessionLocal
-from .models import AccessLog
 from .models import ReviewHistory
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama.llms import OllamaLLM
+from .enrichment import decay_category_heat, schedule_enrichment_batches
+from .metrics import CELERY_TASK_DURATION, flush_shared_metrics
+from .pending import release_pending
+from .prediction_cache import evict_predictions, fill_from_cache, get_cached_predictions, store_predictions
+from .trend_history import roll_up_pending_versions
 
+logger = logging.getLogger(__name__)
 
-# Define the LLM template and model
-template = """You will be asked to generate either sentiment or tone(positive,negative or neutral) for a review. Use the
-            text provided to you and stars(stars are equivalent to the rating,1 being the lowest and 10 being the highest) to determine the sentiment or tone"""
 
-prompt = ChatPromptTemplate.from_template(template)
+# Retries of a failed model call, and the base and maximum backoff between them in seconds
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "2"))
+LLM_RETRY_BACKOFF_MAX = float(os.getenv("LLM_RETRY_BACKOFF_MAX", "300"))
 
-model = OllamaLLM(model="llama3.2")
 
-# Combine the prompt and model into a processing chain
-chain = prompt | model
+# Start times of the tasks running in this process, by task ID
+_task_started = {}
 
 
-# Celery configuration
-celery = Celery(
-    "tasks",
-    broker="redis://localhost:6379/0", # Redis as the message broker
-    backend="redis://localhost:6379/0", #Redis as the result backend
-)
+@task_prerun.connect
+def _start_task_timer(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
 
 
-@celery.task
-def log_access_task(log_text: str):
+@task_postrun.connect
+def _record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        CELERY_TASK_DURATION.observe(time.perf_counter() - started, task=task.name, state=state)
+
+
+@worker_process_shutdown.connect
+def _flush_metrics(**kwargs):
+    # Pool processes may exit without running atexit handlers
+    flush_shared_metrics()
+
+
+def missing_var_for(tone, sentiment):
     """
-    Celery task to log an access event asynchronously.
+    Determines which fields of a review still need to be generated.
 
     Args:
-        log_text (str): The access log message to save.
+        tone (str | None): Current tone of the review.
+        sentiment (str | None): Current sentiment of the review.
 
-    Saves the log entry into the AccessLog table.
+    Returns:
+        str | None: "both", "tone", "sentiment", or None if nothing is missing.
     """
-    
-    db = SessionLocal()
-    try:
-        # Create a new log entry and save it to the database
-        log = AccessLog(text=log_text)
-        db.add(log)
-        db.commit()
-    finally:
-        # Ensure the database session is closed
-        db.close()
-        
-@celery.task
-def llm_sentiment_prediction(id: int, missing_var: str, text: str, stars: int):
+    if not tone and not sentiment:
+        return "both"
+    if not tone:
+        return "tone"
+    if not sentiment:
+        return "sentiment"
+    return None
+
+
+def retry_countdown(retries: int) -> float:
+    """
+    Seconds to wait before retrying an enrichment task: exponential backoff with jitter, and at
+    least until the LLM circuit closes again.
+
+    Args:
+        retries (int): Number of retries already made.
     """
-    Celery task to predict the tone, sentiment, or both using an LLM.
+    backoff = min(LLM_RETRY_BACKOFF_MAX, LLM_RETRY_BACKOFF * 2 ** retries)
+    return max(backoff * random.uniform(0.5, 1.0), llm_circuit.retry_after())
+
+
+@celery.task(bind=True, max_retries=LLM_MAX_RETRIES, acks_late=True, reject_on_worker_lost=True)
+def llm_sentiment_prediction(self, id: int, missing_var: str, text: str, stars: int):
+    """
+    Celery task to predict the tone, sentiment, or both for one review.
 
     Args:
         id (int): The ID of the ReviewHistory entry to update.
@@ -58,9 +89,15 @@ def llm_sentiment_prediction(id: int, missing_var: str, text: str, stars: int):
         text (str): The review text to analyze.
         stars (int): The rating given for the review (1 to 10).
 
-    Fetches the review entry from the database, performs LLM-based prediction, 
-    and updates the tone or sentiment fields.
+    Fetches the review entry from the database, reuses cached predictions for
+    identical content or otherwise runs the configured classifier (see
+    app.classifiers), and updates the tone or sentiment fields. A failed or
+    timed-out model call is retried with exponential backoff, up to
+    LLM_MAX_RETRIES times. The review's pending marker is cleared when the
+    task finishes without a retry. The message is acknowledged only when the
+    task finishes, so the work of a crashed worker is delivered again.
     """
+    retry_error = None
     db = SessionLocal()
     try:
         # Fetching the review entry
@@ -69,28 +106,177 @@ def llm_sentiment_prediction(id: int, missing_var: str, text: str, stars: int):
         if not review:
             raise ValueError(f"No review found with id: {id}")
 
-        # Generating tone or sentiment as needed
-        if missing_var == "tone":
-            review.tone = chain.invoke(
-                {"question": f"Generate the tone for this review. The text of the review '{text}' and the rating given is {stars}."}
-            )
-        elif missing_var == "sentiment":
-            review.sentiment = chain.invoke(
-                {"question": f"Generate the sentiment for this review. The text of the review is '{text}' and the rating given is {stars}."}
-            )
-        elif missing_var == "both":
-            review.tone = chain.invoke(
-                 {"question": f"Generate the tone for this review. The text of the review '{text}' and the rating given is {stars}."}
-            )
-            review.sentiment = chain.invoke(
-                {"question": f"Generate the sentiment for this review. The text of the review is '{text}' and the rating given is {stars}."}
-            )
-
-        # Commit the changes to the database
+        # Reusing cached predictions for this content before running the classifier
+        fields = ["tone", "sentiment"] if missing_var == "both" else [missing_var]
+        predictions = get_cached_predictions(db, fields, text, stars)
+        remaining = [field for field in fields if field not in predictions]
+
+        if remaining:
+            # Generating tone or sentiment as needed ("both" uses a single combined inference)
+            try:
+                generated, _, backend = classifier.classify("both" if len(remaining) == 2 else remaining[0], text, stars)
+                # Batch classifiers report a failed model call as empty values instead of raising
+                if not all(generated.get(field) for field in remaining):
+                    raise ValueError(f"No prediction for {' and '.join(remaining)} of review {id}")
+            except Exception as e:
+                if self.request.retries >= self.max_retries:
+                    raise
+                retry_error = e
+            else:
+                if backend == LLMClassifier.name:
+                    # Only model answers are worth caching; first-pass labels are cheaper to recompute
+                    store_predictions(db, generated, text, stars)
+                predictions.update(generated)
+
+        if retry_error is None:
+            for field, value in predictions.items():
+                setattr(review, field, value)
+
+            # Commit the changes to the database
+            db.commit()
+
+    except Exception as e:
+        logger.exception("Error in LLM prediction task: %s", e)
+        raise
+    finally:
+        db.close()
+        # Allowing the review to be queued again (a retried review stays claimed)
+        if retry_error is None:
+            release_pending([id])
+
+    if retry_error is not None:
+        raise self.retry(exc=retry_error, countdown=retry_countdown(self.request.retries))
+
+
+@celery.task(bind=True, max_retries=LLM_MAX_RETRIES, acks_late=True, reject_on_worker_lost=True)
+def llm_sentiment_prediction_batch(self, ids: list):
+    """
+    Celery task to predict missing tone and/or sentiment for many reviews at once.
+
+    Args:
+        ids (list[int]): IDs of the ReviewHistory entries to enrich.
+
+    Loads all the reviews in one query, fills what it can from the prediction cache,
+    classifies the rest in one batch (escalating low-confidence reviews to the LLM, with
+    at most LLM_MAX_CONCURRENCY concurrent model calls per worker process), and writes every result in a
+    single transaction. Reviews whose prediction failed or timed out are retried as a
+    smaller batch with exponential backoff, up to LLM_MAX_RETRIES times. The pending
+    markers of all other reviews are cleared when the task finishes. The message is
+    acknowledged only when the task finishes, so the work of a crashed worker is
+    delivered again.
+    """
+    retry_ids = []
+    db = SessionLocal()
+    try:
+        # Fetching all the review entries that still need enrichment
+        reviews = (
+            db.query(ReviewHistory)
+            .filter(ReviewHistory.id.in_(ids))
+            .all()
+        )
+
+        # Reusing cached predictions; only reviews with uncached content go to the classifier
+        reviews = [
+            review for review in reviews
+            if missing_var_for(review.tone, review.sentiment) and not fill_from_cache(db, review)
+        ]
+
+        # Classifying the whole batch; clear-cut reviews are labelled in-process and only
+        # low-confidence ones reach the model (with bounded concurrency)
+        results = classifier.classify_batch([
+            (missing_var_for(review.tone, review.sentiment), review.text, review.stars) for review in reviews
+        ])
+
+        failed = []
+        for review, (fields, _, backend) in zip(reviews, results):
+            if not fields:
+                failed.append(review.id)
+            for field, value in fields.items():
+                setattr(review, field, value)
+            if backend == LLMClassifier.name:
+                store_predictions(db, fields, review.text, review.stars)
+
+        # Commit all the changes in a single transaction
         db.commit()
 
+        if failed and self.request.retries < self.max_retries:
+            retry_ids = failed
+
     except Exception as e:
-        print(f"Error in LLM prediction task: {e}")
+        logger.exception("Error in LLM batch prediction task: %s", e)
         raise
     finally:
         db.close()
+        # Allowing the reviews to be queued again (reviews being retried stay claimed)
+        release_pending([id for id in ids if id not in retry_ids])
+
+    if retry_ids:
+        raise self.retry(args=[retry_ids], countdown=retry_countdown(self.request.retries))
+
+
+@celery.task
+def schedule_enrichment():
+    """
+    Celery beat task that keeps tone/sentiment enrichment running independently of read traffic.
+
+    Runs every ENRICHMENT_SCHEDULE_INTERVAL seconds (see app.celery_app), queues the next
+    prioritized batches and decays the category view counts.
+    """
+    db = SessionLocal()
+    try:
+        queued = schedule_enrichment_batches(db)
+        decay_category_heat()
+    finally:
+        db.close()
+    return queued
+
+
+@celery.task
+def rollup_trends():
+    """
+    Celery beat task that adds newly created review versions to the trend history rollups.
+
+    Runs every TREND_ROLLUP_INTERVAL seconds (see app.celery_app) and rolls up every version
+    not yet counted, TREND_ROLLUP_BATCH_SIZE versions per transaction.
+    """
+    db = SessionLocal()
+    try:
+        rolled_up = roll_up_pending_versions(db)
+    finally:
+        db.close()
+    return rolled_up
+
+
+@celery.task
+def evict_prediction_cache():
+    """
+    Celery beat task that keeps the prediction cache within PREDICTION_CACHE_MAX_ENTRIES.
+
+    Runs every PREDICTION_CACHE_EVICT_INTERVAL seconds (see app.celery_app) and deletes the
+    least recently used entries beyond the limit.
+    """
+    db = SessionLocal()
+    try:
+        evicted = evict_predictions(db)
+        db.commit()
+    finally:
+        db.close()
+    return evicted
+
+
+@celery.task
+def archive_history():
+    """
+    Celery beat task that keeps ReviewHistory and AccessLog from growing without bound.
+
+    Runs every ARCHIVE_INTERVAL seconds (see app.celery_app): moves superseded versions older
+    than HISTORY_ARCHIVE_AFTER_DAYS to ReviewHistoryArchive and deletes access log entries
+    older than ACCESS_LOG_RETENTION_DAYS.
+    """
+    db = SessionLocal()
+    try:
+        archived = archive_superseded_versions(db)
+        purged = purge_access_logs(db)
+    finally:
+        db.close()
+    return {"versions_archived": archived, "access_logs_deleted": purged}
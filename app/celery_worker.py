@@ -1,4 +1,92 @@
+import os
+import sys
 from app.celery_tasks import celery
+from app.task_signatures import DEFAULT_QUEUE, ENRICHMENT_QUEUE, MAINTENANCE_QUEUE
 
-# Start the worker with:
-# celery -A celery_worker.celery worker --loglevel=info
+# Worker topology
+#
+# Every kind of work has its own queue (see TASK_QUEUES in app.task_signatures) and its own
+# worker pool, sized for that work:
+#
+#   pool         queues                 work                                      settings
+#   enrichment   enrichment             LLM calls (seconds each)                  processes, prefetch 1, late ack
+#   maintenance  maintenance, celery    enrichment scheduler, rollups, archival   one process, prefetch 1
+#
+# Access logs do not go through Celery: the API buffers them and bulk-inserts them itself (see
+# app.access_log). The default "celery" queue only receives tasks without a route.
+#
+# Enrichment batches carry a priority: reviews users are waiting for (new reviews, most viewed
+# categories) are consumed before the backlog. Prefetch 1 keeps a busy process from reserving
+# batches another process could start, and late ack returns the batches of a crashed worker
+# to the queue.
+#
+# Start each pool (concurrency can be overridden with ENRICHMENT_WORKERS and MAINTENANCE_WORKERS,
+# and any other `celery worker` option appended) with:
+# python -m app.celery_worker enrichment
+# python -m app.celery_worker maintenance
+#
+# which runs e.g.
+# celery -A app.celery_worker.celery worker -Q enrichment -n enrichment@%h --pool prefork --concurrency 2 --prefetch-multiplier 1
+#
+# and the periodic jobs (enrichment scheduler, trend rollups, archival, prediction cache eviction) with:
+# celery -A app.celery_worker.celery beat --loglevel=info
+#
+# Locally, `python -m app.celery_worker all` consumes every queue (in priority order) in one worker
+# with the beat schedule embedded. It needs a Redis-compatible server on REDIS_URL, e.g. a local
+# redis-server, or fakeredis as a stand-in (needs Lua support: pip install "fakeredis[lua]"):
+# python -c "from fakeredis import TcpFakeServer; TcpFakeServer(('127.0.0.1', 6379)).serve_forever()"
+# CELERY_BROKER_URL can point the broker elsewhere.
+
+WORKER_POOLS = {
+    "enrichment": {
+        "queues": [ENRICHMENT_QUEUE],
+        "pool": "prefork",
+        "concurrency": int(os.getenv("ENRICHMENT_WORKERS", "2")),
+        "prefetch_multiplier": 1,
+    },
+    "maintenance": {
+        "queues": [MAINTENANCE_QUEUE, DEFAULT_QUEUE],
+        "pool": "prefork",
+        "concurrency": int(os.getenv("MAINTENANCE_WORKERS", "1")),
+        "prefetch_multiplier": 1,
+    },
+    "all": {
+        "queues": [MAINTENANCE_QUEUE, ENRICHMENT_QUEUE, DEFAULT_QUEUE],
+        "pool": "threads",
+        "concurrency": 4,
+        "prefetch_multiplier": 1,
+        "beat": True,
+    },
+}
+
+
+def worker_argv(pool: str) -> list:
+    """
+    Builds the `celery worker` arguments of a pool in WORKER_POOLS.
+
+    Args:
+        pool (str): Name of the pool.
+
+    Returns:
+        list[str]: Arguments for `celery.worker_main`.
+    """
+    settings = WORKER_POOLS[pool]
+    argv = [
+        "worker",
+        "--loglevel=info",
+        "-Q", ",".join(settings["queues"]),
+        "-n", f"{pool}@%h",
+        "--pool", settings["pool"],
+        "--concurrency", str(settings["concurrency"]),
+        "--prefetch-multiplier", str(settings["prefetch_multiplier"]),
+    ]
+    if settings.get("beat"):
+        argv.append("--beat")
+    return argv
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in WORKER_POOLS:
+        print(f"Usage: python -m app.celery_worker {{{'|'.join(WORKER_POOLS)}}} [celery worker options]")
+        sys.exit(2)
+    celery.worker_main(worker_argv(sys.argv[1]) + sys.argv[2:])
@@ -0,0 +1,85 @@
+import logging
+import os
+import redis
+from .pending import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Consecutive model failures (errors or timeouts) that open the circuit
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+# Seconds the circuit stays open before calls are attempted again
+LLM_CIRCUIT_RESET_TIMEOUT = int(os.getenv("LLM_CIRCUIT_RESET_TIMEOUT", "60"))
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a service whose circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker shared by all processes through Redis.
+
+    After `failure_threshold` consecutive failures the circuit opens for `reset_timeout` seconds:
+    callers skip the service and the enrichment scheduler stops dispatching. Once the timeout
+    expires, calls are attempted again; the next success closes the circuit for good.
+    If Redis is unavailable the circuit is treated as closed.
+
+    Attributes:
+        name (str): Service name, used in the Redis keys.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_timeout (int): Seconds the circuit stays open.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: int):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    @property
+    def _open_key(self) -> str:
+        return f"circuit:{self.name}:open"
+
+    @property
+    def _failures_key(self) -> str:
+        return f"circuit:{self.name}:failures"
+
+    def retry_after(self) -> int:
+        """
+        Returns the seconds until the circuit closes again, or 0 if it is closed.
+        """
+        try:
+            ttl = get_redis().ttl(self._open_key)
+        except redis.RedisError as e:
+            logger.warning("Error reading circuit %s: %s", self.name, e)
+            return 0
+        return max(ttl, 0)
+
+    def is_open(self) -> bool:
+        return self.retry_after() > 0
+
+    def record_success(self):
+        try:
+            get_redis().delete(self._failures_key)
+        except redis.RedisError as e:
+            logger.warning("Error updating circuit %s: %s", self.name, e)
+
+    def record_failure(self):
+        try:
+            pipeline = get_redis().pipeline(transaction=False)
+            pipeline.incr(self._failures_key)
+            # Failures far apart do not count as consecutive
+            pipeline.expire(self._failures_key, self.reset_timeout)
+            failures = pipeline.execute()[0]
+            if failures >= self.failure_threshold:
+                pipeline.set(self._open_key, 1, ex=self.reset_timeout)
+                pipeline.delete(self._failures_key)
+                pipeline.execute()
+                logger.warning("Circuit %s opened for %ss after %s failures", self.name, self.reset_timeout, failures)
+        except redis.RedisError as e:
+            logger.warning("Error updating circuit %s: %s", self.name, e)
+
+
+# Breaker guarding the Ollama model endpoint
+llm_circuit = CircuitBreaker("llm", LLM_CIRCUIT_FAILURE_THRESHOLD, LLM_CIRCUIT_RESET_TIMEOUT)
@@ -0,0 +1,432 @@
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from .circuit_breaker import CircuitOpenError, llm_circuit
+from .metrics import (
+    CLASSIFIER_ERRORS,
+    CLASSIFIER_ESCALATIONS,
+    CLASSIFIER_PREDICTIONS,
+    CLASSIFIER_SECONDS,
+    LLM_REQUEST_DURATION,
+    LLM_TOKENS,
+)
+from .prompts import (
+    COMBINED_QUESTION,
+    LLM_MODEL,
+    SENTIMENT_QUESTION,
+    TONE_QUESTION,
+    parse_combined_prediction,
+    template,
+)
+
+logger = logging.getLogger(__name__)
+
+# "cascade" (lexicon first, low-confidence reviews escalated to the LLM), "lexicon" or "llm"
+CLASSIFIER_BACKEND = os.getenv("CLASSIFIER_BACKEND", "cascade")
+# Minimum lexicon confidence (0 to 1) for a label to be accepted without asking the LLM
+CLASSIFIER_CONFIDENCE_THRESHOLD = float(os.getenv("CLASSIFIER_CONFIDENCE_THRESHOLD", "0.6"))
+# Maximum number of concurrent model calls per worker process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Seconds a single model call may take before it is cancelled
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+
+_chain = None
+
+# Event loop running every model call of this process, the process it was started in, and the
+# semaphore capping the concurrent model calls of the process (LLM_MAX_CONCURRENCY) on that loop
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+_model_slots = None
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the event loop of this process, starting it in a daemon thread on first use.
+
+    The chain keeps an HTTP client bound to the loop it first ran on, so every model call of the
+    process must run on the same loop (a loop per call would leave the client on a closed loop).
+    A process forked from one that had a loop starts its own (with its own concurrency limit) and
+    rebuilds the chain.
+    """
+    global _chain, _loop, _loop_pid, _model_slots
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            if _loop is not None:
+                _chain = None
+            _loop = asyncio.new_event_loop()
+            _model_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+            _loop_pid = os.getpid()
+    return _loop
+
+
+def run_coroutine(coro):
+    """
+    Runs a coroutine on the process event loop and waits for its result; safe to call from any thread.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result()
+
+
+def get_chain():
+    """
+    Returns the LLM processing chain (prompt and Ollama model), building it on first use.
+
+    LangChain is only imported here, so processes that never call the model do not load it.
+    """
+    global _chain
+    if _chain is None:
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_ollama.llms import OllamaLLM
+
+        # Define the LLM prompt and model, and combine them into a processing chain
+        _chain = (ChatPromptTemplate.from_template(template) | OllamaLLM(model=LLM_MODEL)).with_config(
+            callbacks=[_token_usage_handler()]
+        )
+    return _chain
+
+
+def _token_usage_handler():
+    """
+    Builds a LangChain callback counting the prompt and completion tokens reported by Ollama.
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TokenUsageHandler(BaseCallbackHandler):
+        def on_llm_end(self, response, **kwargs):
+            for generations in response.generations:
+                for generation in generations:
+                    info = generation.generation_info or {}
+                    LLM_TOKENS.inc(info.get("prompt_eval_count") or 0, kind="prompt")
+                    LLM_TOKENS.inc(info.get("eval_count") or 0, kind="completion")
+
+    return TokenUsageHandler()
+
+
+def fields_for(missing_var: str) -> list:
+    """
+    Returns the field names covered by a missing_var value ("tone", "sentiment" or "both").
+    """
+    if missing_var == "both":
+        return ["tone", "sentiment"]
+    if missing_var in ("tone", "sentiment"):
+        return [missing_var]
+    raise ValueError(f"Unknown missing_var: {missing_var}")
+
+
+async def _ainvoke(question: str) -> str:
+    # Every model call of the process, whichever task or thread made it, waits for a free slot
+    async with _model_slots:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            # A hung model call is cancelled instead of holding the worker indefinitely
+            answer = await asyncio.wait_for(get_chain().ainvoke({"question": question}), timeout=LLM_TIMEOUT)
+            outcome = "ok"
+            return answer
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            LLM_REQUEST_DURATION.observe(time.perf_counter() - started, outcome=outcome)
+
+
+async def apredict_fields(missing_var: str, text: str, stars: int) -> dict:
+    """
+    Runs the LLM for the requested field(s) of a single review.
+
+    For "both", tone and sentiment are requested in one combined JSON prompt; if the answer
+    cannot be parsed it falls back to one call per field. Every call is bounded by LLM_TIMEOUT.
+
+    Args:
+        missing_var (str): "tone", "sentiment" or "both".
+        text (str): The review text to analyze.
+        stars (int): The rating given for the review (1 to 10).
+
+    Returns:
+        dict: The predicted values keyed by field name.
+    """
+    fields = fields_for(missing_var)
+    if missing_var == "both":
+        combined = parse_combined_prediction(await _ainvoke(COMBINED_QUESTION.format(text=text, stars=stars)))
+        if combined is not None:
+            return combined
+
+    questions = {"tone": TONE_QUESTION, "sentiment": SENTIMENT_QUESTION}
+    return {
+        field: await _ainvoke(questions[field].format(text=text, stars=stars))
+        for field in fields
+    }
+
+
+def _record(backend: str, predictions: int = 0, escalations: int = 0, errors: int = 0, seconds: float = 0.0):
+    # Per-backend counters: labels produced, reviews escalated, failures and time spent
+    CLASSIFIER_PREDICTIONS.inc(predictions, backend=backend)
+    CLASSIFIER_ESCALATIONS.inc(escalations, backend=backend)
+    CLASSIFIER_ERRORS.inc(errors, backend=backend)
+    CLASSIFIER_SECONDS.inc(seconds, backend=backend)
+
+
+class LexiconClassifier:
+    """
+    In-process tone/sentiment classifier: a linear score over the star rating and a small word lexicon.
+
+    The score is a weighted sum of the rating (mapped to -1..1) and the balance of positive and
+    negative words (a negation flips the next word). It gives the tone (Positive, Negative or
+    Neutral, as in the LLM prompt), and its magnitude is the confidence; reviews where the rating
+    and the words disagree, or that land near neutral, get a low confidence.
+    The sentiment is the emotion named most often by the review among those matching its tone
+    (e.g. "frustrating" gives Frustrated). Without such a word it falls back to a generic label for
+    the tone, at a reduced confidence, so the cascade can ask the LLM instead.
+
+    Attributes:
+        name (str): Backend name used as the metrics label.
+    """
+
+    name = "lexicon"
+
+    STARS_WEIGHT = 0.6
+    TEXT_WEIGHT = 0.4
+    # Scores within this distance of zero are labelled neutral
+    NEUTRAL_BAND = 0.2
+    # Confidence factor of a sentiment inferred from the tone alone, without an emotion word
+    UNCUED_SENTIMENT_WEIGHT = 0.5
+
+    # Sentiment labels (as written by the LLM) and the words that express them, by tone
+    POSITIVE_SENTIMENTS = {
+        "Delighted": frozenset({"amazing", "awesome", "brilliant", "delighted", "fantastic", "love", "loved", "superb", "wonderful"}),
+        "Happy": frozenset({"enjoy", "enjoyed", "glad", "happy", "lovely", "pleased", "pleasant"}),
+        "Satisfied": frozenset({"comfortable", "good", "helpful", "recommend", "recommended", "satisfied", "worth"}),
+    }
+    NEGATIVE_SENTIMENTS = {
+        "Angry": frozenset({"angry", "furious", "hate", "hated", "outrageous", "rude"}),
+        "Frustrated": frozenset({"annoyed", "annoying", "broken", "frustrated", "frustrating", "slow", "useless"}),
+        "Disappointed": frozenset({"disappointed", "disappointing", "mediocre", "unhappy", "waste"}),
+    }
+    # Sentiment given when no emotion word matches the tone
+    DEFAULT_SENTIMENTS = {"Positive": "Satisfied", "Negative": "Disappointed", "Neutral": "Neutral"}
+
+    POSITIVE_WORDS = frozenset({
+        "best", "delicious", "excellent", "friendly", "great", "impressed", "nice", "perfect",
+    }).union(*POSITIVE_SENTIMENTS.values())
+    NEGATIVE_WORDS = frozenset({
+        "awful", "bad", "dirty", "horrible", "poor", "refund", "terrible", "worse", "worst", "wrong",
+    }).union(*NEGATIVE_SENTIMENTS.values())
+    NEGATIONS = frozenset({"no", "not", "never", "hardly", "isn't", "wasn't", "don't", "didn't", "doesn't"})
+
+    _TOKEN = re.compile(r"[a-z']+")
+
+    def _scan(self, text: str) -> tuple:
+        """
+        Counts the positive and negative words of a review and the (non-negated) emotion words per sentiment.
+        """
+        positive = negative = 0
+        emotions = Counter()
+        negated = False
+        for token in self._TOKEN.findall((text or "").lower()):
+            if token in self.NEGATIONS:
+                negated = True
+                continue
+            if token in self.POSITIVE_WORDS:
+                negative, positive = (negative + 1, positive) if negated else (negative, positive + 1)
+            elif token in self.NEGATIVE_WORDS:
+                positive, negative = (positive + 1, negative) if negated else (positive, negative + 1)
+            if not negated:
+                for label, words in (*self.POSITIVE_SENTIMENTS.items(), *self.NEGATIVE_SENTIMENTS.items()):
+                    if token in words:
+                        emotions[label] += 1
+            negated = False
+        return positive, negative, emotions
+
+    def _score(self, stars: int, positive: int, negative: int) -> float:
+        stars_signal = (min(max(stars, 1), 10) - 5.5) / 4.5
+        text_signal = (positive - negative) / (positive + negative) if positive + negative else 0.0
+        return self.STARS_WEIGHT * stars_signal + self.TEXT_WEIGHT * text_signal
+
+    def score(self, text: str, stars: int) -> float:
+        """
+        Returns the polarity score of a review, from -1 (negative) to 1 (positive).
+        """
+        positive, negative, _ = self._scan(text)
+        return self._score(stars, positive, negative)
+
+    def classify(self, missing_var: str, text: str, stars: int) -> tuple:
+        """
+        Labels one review.
+
+        Args:
+            missing_var (str): "tone", "sentiment" or "both".
+            text (str): The review text.
+            stars (int): The rating given for the review (1 to 10).
+
+        Returns:
+            tuple: (values keyed by field, confidence from 0 to 1 (the lowest of the requested
+            fields), backend name).
+        """
+        positive, negative, emotions = self._scan(text)
+        score = self._score(stars, positive, negative)
+        if score > self.NEUTRAL_BAND:
+            tone, tone_confidence = "Positive", min(score, 1.0)
+        elif score < -self.NEUTRAL_BAND:
+            tone, tone_confidence = "Negative", min(-score, 1.0)
+        else:
+            # Near-zero scores are as likely mixed as truly neutral
+            tone, tone_confidence = "Neutral", self.NEUTRAL_BAND - abs(score)
+
+        # Only emotions agreeing with the tone are kept; a neutral review gets a neutral sentiment
+        matching = {"Positive": self.POSITIVE_SENTIMENTS, "Negative": self.NEGATIVE_SENTIMENTS}.get(tone, {})
+        cues = [(count, label) for label, count in emotions.items() if label in matching]
+        if cues:
+            sentiment, sentiment_confidence = max(cues)[1], tone_confidence
+        else:
+            sentiment, sentiment_confidence = self.DEFAULT_SENTIMENTS[tone], tone_confidence * self.UNCUED_SENTIMENT_WEIGHT
+
+        labels = {"tone": (tone, tone_confidence), "sentiment": (sentiment, sentiment_confidence)}
+        fields = fields_for(missing_var)
+        return (
+            {field: labels[field][0] for field in fields},
+            min(labels[field][1] for field in fields),
+            self.name,
+        )
+
+    def classify_batch(self, items: list) -> list:
+        """
+        Labels many reviews.
+
+        Args:
+            items (list[tuple]): (missing_var, text, stars) per review.
+
+        Returns:
+            list[tuple]: (values, confidence, backend name) per review, in order.
+        """
+        started = time.perf_counter()
+        results = [self.classify(*item) for item in items]
+        _record(self.name, predictions=len(results), seconds=time.perf_counter() - started)
+        return results
+
+
+class LLMClassifier:
+    """
+    Tone/sentiment classifier backed by the Ollama LLM chain.
+
+    Calls go through the chain's async API on the persistent event loop of the process (see
+    `run_coroutine`), where at most LLM_MAX_CONCURRENCY model calls run at once across all the
+    tasks of the process, with a timeout per call and the shared `llm_circuit` breaker: while
+    the circuit is open no call is made and predictions fail with CircuitOpenError.
+
+    Attributes:
+        name (str): Backend name used as the metrics label.
+    """
+
+    name = "llm"
+
+    async def _aclassify(self, missing_var: str, text: str, stars: int) -> tuple:
+        if llm_circuit.is_open():
+            raise CircuitOpenError("LLM circuit is open")
+        started = time.perf_counter()
+        try:
+            values = await apredict_fields(missing_var, text, stars)
+        except Exception:
+            _record(self.name, errors=1, seconds=time.perf_counter() - started)
+            llm_circuit.record_failure()
+            raise
+        _record(self.name, predictions=1, seconds=time.perf_counter() - started)
+        llm_circuit.record_success()
+        return values, 1.0, self.name
+
+    def classify(self, missing_var: str, text: str, stars: int) -> tuple:
+        """
+        Labels one review; model errors, timeouts and an open circuit propagate.
+
+        Returns:
+            tuple: (values keyed by field, confidence (always 1.0), backend name).
+        """
+        return run_coroutine(self._aclassify(missing_var, text, stars))
+
+    def classify_batch(self, items: list) -> list:
+        """
+        Labels many reviews concurrently; a failed prediction is reported and returned with empty values.
+
+        Args:
+            items (list[tuple]): (missing_var, text, stars) per review.
+
+        Returns:
+            list[tuple]: (values, confidence, backend name) per review, in order.
+        """
+        async def run():
+            return await asyncio.gather(*(self._aclassify(*item) for item in items), return_exceptions=True)
+
+        if not items:
+            return []
+        results = []
+        for result in run_coroutine(run()):
+            if isinstance(result, BaseException):
+                logger.warning("Error in LLM prediction: %r", result)
+                result = ({}, 0.0, self.name)
+            results.append(result)
+        return results
+
+
+class CascadeClassifier:
+    """
+    Labels reviews with a fast classifier and escalates low-confidence ones to a slower, better one.
+
+    Attributes:
+        fast: First-pass classifier (e.g. LexiconClassifier).
+        fallback: Classifier used below the threshold (e.g. LLMClassifier).
+        threshold (float): Minimum first-pass confidence for a label to be kept.
+    """
+
+    def __init__(self, fast, fallback, threshold: float = CLASSIFIER_CONFIDENCE_THRESHOLD):
+        self.fast = fast
+        self.fallback = fallback
+        self.threshold = threshold
+
+    def classify(self, missing_var: str, text: str, stars: int) -> tuple:
+        return self.classify_batch([(missing_var, text, stars)])[0]
+
+    def classify_batch(self, items: list) -> list:
+        """
+        Labels many reviews, escalating only those the fast classifier is unsure about.
+
+        Args:
+            items (list[tuple]): (missing_var, text, stars) per review.
+
+        Returns:
+            list[tuple]: (values, confidence, backend name) per review, in order.
+        """
+        results = self.fast.classify_batch(items)
+        escalated = [index for index, (_, confidence, _) in enumerate(results) if confidence < self.threshold]
+        if escalated:
+            _record(self.fast.name, escalations=len(escalated))
+            for index, result in zip(escalated, self.fallback.classify_batch([items[index] for index in escalated])):
+                results[index] = result
+        return results
+
+
+def build_classifier(backend: str = CLASSIFIER_BACKEND, threshold: float = CLASSIFIER_CONFIDENCE_THRESHOLD):
+    """
+    Builds the classifier selected by CLASSIFIER_BACKEND.
+
+    Args:
+        backend (str): "cascade", "lexicon" or "llm".
+        threshold (float): Confidence threshold for escalation (cascade only).
+
+    Returns:
+        The classifier, exposing classify(missing_var, text, stars) and classify_batch(items).
+    """
+    if backend == "lexicon":
+        return LexiconClassifier()
+    if backend == "llm":
+        return LLMClassifier()
+    if backend == "cascade":
+        return CascadeClassifier(LexiconClassifier(), LLMClassifier(), threshold)
+    raise ValueError(f"Unknown classifier backend: {backend}")
+
+
+classifier = build_classifier()
@@ -0,0 +1,198 @@
+import argparse
+import json
+import sys
+from .archival import (
+    ACCESS_LOG_RETENTION_DAYS, ARCHIVE_BATCH_SIZE, HISTORY_ARCHIVE_AFTER_DAYS, archive_superseded_versions,
+    purge_access_logs,
+)
+from .database import SessionLocal
+from .enrichment import ENRICHMENT_MAX_IN_FLIGHT, schedule_enrichment_batches
+from .ingestion import INGEST_CHUNK_SIZE, ingest_versions, parse_csv, parse_ndjson
+from .projections import rebuild_category_stats, verify_category_stats
+from .trend_history import TREND_ROLLUP_BATCH_SIZE, roll_up_pending_versions
+
+
+def stats_verify(args) -> int:
+    """
+    Recomputes the category aggregates and reports any drift from the stored CategoryStats.
+
+    Returns:
+        int: Process exit code (1 if drift was found).
+    """
+    db = SessionLocal()
+    try:
+        drift = verify_category_stats(db)
+    finally:
+        db.close()
+
+    print(json.dumps({"drifted_categories": len(drift), "drift": drift}, indent=2))
+    return 1 if drift else 0
+
+
+def stats_rebuild(args) -> int:
+    """
+    Rebuilds every CategoryStats row from ReviewHistory, reporting the drift that was repaired.
+
+    Returns:
+        int: Process exit code.
+    """
+    db = SessionLocal()
+    try:
+        drift = verify_category_stats(db)
+        written = rebuild_category_stats(db)
+        db.commit()
+    finally:
+        db.close()
+
+    print(json.dumps({"categories_written": written, "repaired_drift": drift}, indent=2))
+    return 0
+
+
+def ingest(args) -> int:
+    """
+    Bulk-loads review versions from an NDJSON or CSV file.
+
+    Returns:
+        int: Process exit code (1 if any record was rejected).
+    """
+    format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    with open(args.path, newline="", encoding="utf-8") as file:
+        records = parse_csv(file) if format == "csv" else parse_ndjson(file)
+        result = ingest_versions(records, chunk_size=args.chunk_size)
+
+    print(json.dumps(result, indent=2))
+    return 1 if result["rejected"] else 0
+
+
+def enrich_schedule(args) -> int:
+    """
+    Runs one pass of the enrichment scheduler, queueing prioritized reviews missing tone/sentiment.
+
+    Returns:
+        int: Process exit code.
+    """
+    db = SessionLocal()
+    try:
+        queued = schedule_enrichment_batches(db, max_in_flight=args.max_in_flight)
+    finally:
+        db.close()
+
+    print(json.dumps({"enrichment_queued": queued}, indent=2))
+    return 0
+
+
+def trends_backfill(args) -> int:
+    """
+    Adds every review version not yet counted (e.g. history from before the rollups existed)
+    to the trend history rollups.
+
+    Returns:
+        int: Process exit code.
+    """
+    db = SessionLocal()
+    try:
+        rolled_up = roll_up_pending_versions(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print(json.dumps({"versions_rolled_up": rolled_up}, indent=2))
+    return 0
+
+
+def history_archive(args) -> int:
+    """
+    Moves superseded review versions older than the retention window to ReviewHistoryArchive.
+
+    Returns:
+        int: Process exit code.
+    """
+    db = SessionLocal()
+    try:
+        archived = archive_superseded_versions(db, older_than_days=args.older_than_days, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print(json.dumps({"versions_archived": archived}, indent=2))
+    return 0
+
+
+def access_log_purge(args) -> int:
+    """
+    Deletes access log entries older than the retention period.
+
+    Returns:
+        int: Process exit code.
+    """
+    db = SessionLocal()
+    try:
+        deleted = purge_access_logs(db, older_than_days=args.older_than_days, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print(json.dumps({"access_logs_deleted": deleted}, indent=2))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line parser for the maintenance commands.
+
+    Usage:
+        python -m app.cli stats verify
+        python -m app.cli stats rebuild
+        python -m app.cli ingest reviews.ndjson [--format csv] [--chunk-size 5000]
+        python -m app.cli enrich schedule [--max-in-flight 200]
+        python -m app.cli trends backfill [--batch-size 5000]
+        python -m app.cli history archive [--older-than-days 90] [--batch-size 5000]
+        python -m app.cli access-log purge [--older-than-days 30] [--batch-size 5000]
+    """
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Reviews app maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stats = commands.add_parser("stats", help="Maintain the precomputed CategoryStats aggregates")
+    stats_commands = stats.add_subparsers(dest="action", required=True)
+    stats_commands.add_parser("verify", help="Report drift between CategoryStats and ReviewHistory").set_defaults(func=stats_verify)
+    stats_commands.add_parser("rebuild", help="Recompute CategoryStats from ReviewHistory").set_defaults(func=stats_rebuild)
+
+    ingest_parser = commands.add_parser("ingest", help="Bulk-load review versions from an NDJSON or CSV file")
+    ingest_parser.add_argument("path", help="File to load")
+    ingest_parser.add_argument("--format", choices=["ndjson", "csv"], help="Defaults to the file extension")
+    ingest_parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="Versions per transaction")
+    ingest_parser.set_defaults(func=ingest)
+
+    enrich = commands.add_parser("enrich", help="Tone/sentiment enrichment of stored reviews")
+    enrich_commands = enrich.add_subparsers(dest="action", required=True)
+    schedule_parser = enrich_commands.add_parser("schedule", help="Queue one round of prioritized enrichment batches")
+    schedule_parser.add_argument("--max-in-flight", type=int, default=ENRICHMENT_MAX_IN_FLIGHT, help="Reviews queued or running at most")
+    schedule_parser.set_defaults(func=enrich_schedule)
+
+    trends = commands.add_parser("trends", help="Maintain the trend history rollups")
+    trends_commands = trends.add_subparsers(dest="action", required=True)
+    backfill_parser = trends_commands.add_parser("backfill", help="Roll up every version not yet counted")
+    backfill_parser.add_argument("--batch-size", type=int, default=TREND_ROLLUP_BATCH_SIZE, help="Versions per transaction")
+    backfill_parser.set_defaults(func=trends_backfill)
+
+    history = commands.add_parser("history", help="Archive superseded review versions")
+    history_commands = history.add_subparsers(dest="action", required=True)
+    archive_parser = history_commands.add_parser("archive", help="Move old superseded versions to ReviewHistoryArchive")
+    archive_parser.add_argument("--older-than-days", type=float, default=HISTORY_ARCHIVE_AFTER_DAYS, help="Minimum version age")
+    archive_parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Versions per transaction")
+    archive_parser.set_defaults(func=history_archive)
+
+    access_log = commands.add_parser("access-log", help="Apply the access log retention period")
+    access_log_commands = access_log.add_subparsers(dest="action", required=True)
+    purge_parser = access_log_commands.add_parser("purge", help="Delete access log entries older than the retention period")
+    purge_parser.add_argument("--older-than-days", type=float, default=ACCESS_LOG_RETENTION_DAYS, help="Retention period")
+    purge_parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Entries per transaction")
+    purge_parser.set_defaults(func=access_log_purge)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import logging
+import os
+import redis
+from sqlalchemy import select
+from .circuit_breaker import llm_circuit
+from .models import ReviewHistory, UNENRICHED
+from .pending import claim_pending, get_redis, pending_count, release_pending
+from .task_signatures import PREDICTION_BATCH_TASK, PRIORITY_BACKFILL, PRIORITY_INTERACTIVE, send_task
+
+logger = logging.getLogger(__name__)
+
+# Largest number of reviews sent to the worker in one batch task
+ENRICHMENT_BATCH_SIZE = int(os.getenv("ENRICHMENT_BATCH_SIZE", "50"))
+# Maximum number of reviews queued or being enriched at once; bounds the load on the LLM
+ENRICHMENT_MAX_IN_FLIGHT = int(os.getenv("ENRICHMENT_MAX_IN_FLIGHT", "200"))
+# Number of most viewed categories served first, and the factor applied to view counts after each run
+ENRICHMENT_HOT_CATEGORIES = int(os.getenv("ENRICHMENT_HOT_CATEGORIES", "10"))
+ENRICHMENT_HEAT_DECAY = float(os.getenv("ENRICHMENT_HEAT_DECAY", "0.5"))
+
+# Sorted set of category IDs scored by (decaying) page views
+CATEGORY_HEAT_KEY = "enrichment:category_heat"
+
+
+def record_category_view(category_id: int):
+    """
+    Counts a page view of a category, so the scheduler enriches hot categories first.
+
+    Args:
+        category_id (int): The viewed category.
+    """
+    try:
+        get_redis().zincrby(CATEGORY_HEAT_KEY, 1, str(category_id))
+    except redis.RedisError as e:
+        logger.warning("Error recording category view: %s", e)
+
+
+def dispatch_enrichment(ids) -> int:
+    """
+    Queues enrichment for reviews right away, in batches of ENRICHMENT_BATCH_SIZE.
+
+    Used by short-lived producers (e.g. bulk ingestion) that know exactly which rows are new.
+    Reviews already queued or running are skipped. The batches are sent with interactive
+    priority, ahead of the backlog queued by the scheduler.
+
+    Args:
+        ids (Iterable[int]): IDs of ReviewHistory entries missing tone and/or sentiment.
+
+    Returns:
+        int: Number of reviews queued.
+    """
+    return _dispatch_in_batches(claim_pending(ids), PRIORITY_INTERACTIVE)
+
+
+def _dispatch_in_batches(ids: list, priority: int) -> int:
+    start = 0
+    try:
+        for start in range(0, len(ids), ENRICHMENT_BATCH_SIZE):
+            send_task(PREDICTION_BATCH_TASK, ids[start:start + ENRICHMENT_BATCH_SIZE], priority=priority)
+    except Exception:
+        # Reviews whose batch was not sent can be queued again right away instead of when their claim expires
+        release_pending(ids[start:])
+        raise
+    return len(ids)
+
+
+def _hot_categories() -> list:
+    return [int(id) for id in get_redis().zrevrange(CATEGORY_HEAT_KEY, 0, ENRICHMENT_HOT_CATEGORIES - 1)]
+
+
+def decay_category_heat():
+    """
+    Multiplies every category view count by ENRICHMENT_HEAT_DECAY after a scheduler run, so the
+    ranking follows recent traffic.
+    """
+    get_redis().zunionstore(CATEGORY_HEAT_KEY, {CATEGORY_HEAT_KEY: ENRICHMENT_HEAT_DECAY})
+
+
+def schedule_enrichment_batches(db, max_in_flight: int = ENRICHMENT_MAX_IN_FLIGHT) -> int:
+    """
+    Finds latest reviews missing tone/sentiment and queues them in priority order.
+
+    - Only as many reviews are queued as keep at most `max_in_flight` queued or running.
+    - The most viewed categories are served first, then everything else; newest reviews first.
+      Batches of the most viewed categories are sent with interactive priority, the rest as backfill.
+    - Candidates are read from the partial `ix_ReviewHistory_unenriched` index.
+    - Nothing is queued while the LLM circuit is open (the model endpoint is failing or saturated).
+
+    Args:
+        db (Session): Database session.
+        max_in_flight (int): Maximum number of reviews queued or being enriched at once.
+
+    Returns:
+        int: Number of reviews queued by this run.
+    """
+    if llm_circuit.is_open():
+        return 0
+
+    in_flight = pending_count()
+    capacity = max_in_flight - in_flight
+    if capacity <= 0:
+        return 0
+
+    # Reviews already claimed may come back from the queries, so look ahead past them
+    lookahead = capacity + in_flight
+
+    def newest_unenriched(*criteria):
+        return db.execute(
+            select(ReviewHistory.id)
+            .where(UNENRICHED, *criteria)
+            .order_by(ReviewHistory.created_at.desc())
+            .limit(lookahead)
+        ).scalars().all()
+
+    # Candidates in priority order: hot categories, then all categories, newest first
+    candidates = {}
+    for category_id in _hot_categories():
+        for id in newest_unenriched(ReviewHistory.category_id == category_id):
+            candidates[id] = PRIORITY_INTERACTIVE
+    for id in newest_unenriched():
+        candidates.setdefault(id, PRIORITY_BACKFILL)
+
+    claimed = claim_pending(candidates)
+    # Claims beyond the capacity are given back for a later run
+    release_pending(claimed[capacity:])
+    claimed = claimed[:capacity]
+    return sum(
+        _dispatch_in_batches([id for id in claimed if candidates[id] == priority], priority)
+        for priority in (PRIORITY_INTERACTIVE, PRIORITY_BACKFILL)
+    )
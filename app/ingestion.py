@@ -0,0 +1,193 @@
+import csv
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from itertools import islice
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from .database import SessionLocal
+from .enrichment import dispatch_enrichment
+from .models import Category, ReviewHistory
+from .projections import apply_bulk_versions, commit_versions
+from .schemas import ReviewVersionCreate
+
+logger = logging.getLogger(__name__)
+
+# Number of review versions inserted per transaction
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "5000"))
+# Maximum number of rejected records reported back in detail
+INGEST_MAX_REPORTED_ERRORS = 100
+
+# Optional CSV columns where an empty cell means "not provided"
+_NULLABLE_CSV_FIELDS = ("text", "tone", "sentiment", "created_at")
+
+
+def parse_ndjson(lines):
+    """
+    Parses JSON lines into ingestion records.
+
+    Args:
+        lines (Iterable[str]): One JSON object per line; blank lines are skipped.
+
+    Yields:
+        tuple: (line number, dict) for parsed lines or (line number, str) with the parse error.
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+            continue
+        yield number, record if isinstance(record, dict) else "Expected a JSON object"
+
+
+def parse_csv(lines):
+    """
+    Parses CSV (with a header row) into ingestion records.
+
+    Args:
+        lines (Iterable[str]): CSV lines, the first being the header.
+
+    Yields:
+        tuple: (record number, dict) for each data row.
+    """
+    for number, record in enumerate(csv.DictReader(lines), start=1):
+        for field in _NULLABLE_CSV_FIELDS:
+            if record.get(field) == "":
+                record[field] = None
+        yield number, record
+
+
+def _describe(error: dict) -> str:
+    # "stars: Field required" rather than a bare message, so the rejected field is named
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+def _validate_chunk(db, chunk: list, now: datetime):
+    """
+    Validates a chunk of parsed records, returning the insertable rows and the rejected records.
+    """
+    rows, errors = [], []
+    for number, record in chunk:
+        if isinstance(record, str):
+            errors.append({"line": number, "error": record})
+            continue
+        try:
+            version = ReviewVersionCreate.model_validate(record)
+        except ValidationError as e:
+            errors.append({"line": number, "error": "; ".join(_describe(error) for error in e.errors())})
+            continue
+
+        created_at = version.created_at or now
+        if created_at.tzinfo is not None:
+            # Timestamps are stored as naive UTC, like CURRENT_TIMESTAMP
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        rows.append({
+            "number": number,
+            "review_id": version.review_id,
+            "text": version.text,
+            "stars": version.stars,
+            "category_id": version.category_id,
+            "tone": version.tone,
+            "sentiment": version.sentiment,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+
+    # Rejecting versions that reference unknown categories
+    category_ids = {row["category_id"] for row in rows}
+    known = set(db.execute(select(Category.id).where(Category.id.in_(category_ids))).scalars()) if rows else set()
+    valid = []
+    for row in rows:
+        number = row.pop("number")
+        if row["category_id"] in known:
+            valid.append(row)
+        else:
+            errors.append({"line": number, "error": f"Unknown category_id: {row['category_id']}"})
+
+    return valid, errors
+
+
+def _write_chunk(db, rows: list) -> list:
+    """
+    Inserts a chunk of validated rows with its projection updates, returning the IDs of the new
+    latest versions that still need enrichment.
+    """
+    apply_bulk_versions(db, rows)
+    # Plain executemany (no RETURNING, which would force row-at-a-time inserts on SQLite)
+    db.execute(insert(ReviewHistory.__table__), rows)
+
+    # Only the latest versions are served, so only they need tone/sentiment
+    unenriched = {row["review_id"] for row in rows if row["is_latest"] and (not row["tone"] or not row["sentiment"])}
+    return db.execute(
+        select(ReviewHistory.id).where(
+            ReviewHistory.review_id.in_(unenriched),
+            ReviewHistory.is_latest.is_(True),
+        )
+    ).scalars().all() if unenriched else []
+
+
+def ingest_versions(records, chunk_size: int = INGEST_CHUNK_SIZE) -> dict:
+    """
+    Inserts review versions in chunked transactions and queues their enrichment in batches.
+
+    - Each chunk is validated with ReviewVersionCreate; invalid records are skipped and reported.
+    - Rows are written with a single executemany INSERT per chunk. The is_latest pointer and the
+      CategoryStats aggregates are maintained set-wise for the chunk in the same transaction,
+      which is retried if a concurrent ingest of the same reviews committed first.
+    - After each commit, new latest versions missing tone/sentiment are queued for enrichment
+      in batches (reviews already queued are skipped). If the broker is unavailable they are
+      reported as not queued and left to the enrichment scheduler.
+
+    Args:
+        records (Iterable[tuple]): (line number, dict or parse error) pairs from parse_ndjson/parse_csv.
+        chunk_size (int): Number of records per transaction.
+
+    Returns:
+        dict: Counts of inserted and rejected records, reviews queued (and not queued) for enrichment,
+        and the first errors.
+    """
+    records = iter(records)
+    inserted = enrichment_queued = enrichment_not_queued = rejected = 0
+    errors = []
+
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+
+        db = SessionLocal()
+        try:
+            rows, chunk_errors = _validate_chunk(db, chunk, datetime.now(timezone.utc).replace(tzinfo=None))
+            rejected += len(chunk_errors)
+            errors.extend(chunk_errors[: INGEST_MAX_REPORTED_ERRORS - len(errors)])
+            if not rows:
+                continue
+
+            # Retried from scratch if a concurrent ingest promoted versions of the same reviews first
+            ids = commit_versions(db, lambda session: _write_chunk(session, rows))
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        inserted += len(rows)
+        try:
+            enrichment_queued += dispatch_enrichment(ids)
+        except Exception as e:
+            # The rows are committed; the enrichment scheduler queues them once the broker is back
+            logger.exception("Error queueing enrichment of %s ingested reviews: %s", len(ids), e)
+            enrichment_not_queued += len(ids)
+
+    return {
+        "inserted": inserted,
+        "rejected": rejected,
+        "enrichment_queued": enrichment_queued,
+        "enrichment_not_queued": enrichment_not_queued,
+        "errors": errors,
+    }
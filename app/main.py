@@ -1,12 +1,49 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from .routers import reviews
-from .database import init_db
+from .database import DB_CREATE_ALL, init_db
+from .access_log import access_log_buffer
+from .metrics import observe_request, render, start_query_tracking
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan hook.
+
+    On startup, creates missing tables (unless DB_CREATE_ALL is disabled); on shutdown,
+    writes any buffered access log entries.
+    """
+    if DB_CREATE_ALL:
+        init_db()
+    yield
+    access_log_buffer.close()
+
 
 # Create an instance of the FastAPI application
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
 
-# Initialize the database and create all tables if they don't exist
-init_db()
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Records the latency, status and SQL statement count/time of every request, per route handler.
+    """
+    started = time.perf_counter()
+    queries = start_query_tracking()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Labelled by the matched route's handler name rather than the raw path, to bound cardinality
+        route = request.scope.get("route")
+        observe_request(
+            request.method, route.name if route else "unmatched", status, time.perf_counter() - started, queries
+        )
 
 
 # Register the `reviews` router under the `/reviews` prefix
@@ -22,3 +59,15 @@ async def root():
         dict: A welcome message for the FastAPI Reviews App.
     """
     return {"message": "Welcome to the FastAPI Reviews App!"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Metrics endpoint in the Prometheus text format.
+
+    Covers request latency and SQL per route, SQL statement timing, cache hit rates, Celery
+    queue lengths and task durations, and LLM latency and token counts (worker-side metrics
+    are aggregated across processes in Redis).
+    """
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
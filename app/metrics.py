@@ -0,0 +1,390 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+import redis
+from sqlalchemy import event
+from .pending import get_redis, pending_count
+from .task_signatures import CELERY_QUEUES, queue_keys
+
+logger = logging.getLogger(__name__)
+
+# Default histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Seconds between writes of the shared (Redis) metrics recorded by a process
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1.0"))
+# Celery queues whose length is reported (every queue of app.task_signatures by default)
+METRICS_CELERY_QUEUES = [name for name in os.getenv("METRICS_CELERY_QUEUES", ",".join(CELERY_QUEUES)).split(",") if name]
+
+# Every metric, in the order they are rendered
+_registry = []
+
+
+class _LocalStore:
+    """
+    Metric values kept in this process.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def add(self, increments: dict):
+        with self._lock:
+            for field, amount in increments.items():
+                self._values[field] = self._values.get(field, 0.0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+
+class _SharedBuffer:
+    """
+    Increments of the shared metrics recorded in this process and not yet written to Redis.
+
+    A daemon thread writes them every METRICS_FLUSH_INTERVAL seconds, every metric in one
+    pipeline, so recording a metric never waits on Redis (e.g. inside a flush hook holding a
+    database lock). Pending increments are also written at exit; a forked process starts with
+    an empty buffer, as its parent writes its own.
+    """
+
+    def __init__(self):
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, key: str, increments: dict):
+        with self._lock:
+            values = self._pending.setdefault(key, {})
+            for field, amount in increments.items():
+                values[field] = values.get(field, 0.0) + amount
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+                self._thread.start()
+
+    def pending(self, key: str) -> dict:
+        with self._lock:
+            return dict(self._pending.get(key, {}))
+
+    def flush(self):
+        """
+        Writes the pending increments to Redis; they are dropped if Redis is unavailable.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            pipeline = get_redis().pipeline(transaction=False)
+            for key, values in pending.items():
+                for field, amount in values.items():
+                    pipeline.hincrbyfloat(key, field, amount)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning("Error recording metrics: %s", e)
+
+    def _run(self):
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+
+_shared_buffer = _SharedBuffer()
+
+
+def flush_shared_metrics():
+    """
+    Writes the shared metric increments recorded by this process to Redis now.
+    """
+    _shared_buffer.flush()
+
+
+class _RedisStore:
+    """
+    Metric values shared by every process (API and Celery workers), kept in one Redis hash per metric.
+
+    Increments are buffered in process and written periodically (see _SharedBuffer); reads add
+    the increments this process has not written yet.
+    """
+
+    def __init__(self, name: str):
+        self.key = f"metrics:{name}"
+
+    def add(self, increments: dict):
+        _shared_buffer.add(self.key, increments)
+
+    def snapshot(self) -> dict:
+        pending = _shared_buffer.pending(self.key)
+        try:
+            values = {field.decode(): float(value) for field, value in get_redis().hgetall(self.key).items()}
+        except redis.RedisError as e:
+            logger.warning("Error reading metric %s: %s", self.key, e)
+            values = {}
+        for field, amount in pending.items():
+            values[field] = values.get(field, 0.0) + amount
+        return values
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """
+    Base class of the metric types.
+
+    Attributes:
+        name (str): Metric name.
+        help (str): Description shown in the exposition.
+        labelnames (list[str]): Label names, in order.
+        shared (bool): Whether values are aggregated across processes in Redis (for metrics
+            recorded by Celery workers) instead of kept in this process.
+    """
+
+    type = None
+
+    def __init__(self, name: str, help: str, labelnames=(), shared: bool = False):
+        self.name = name
+        self.help = help
+        self.labelnames = list(labelnames)
+        self.shared = shared
+        self._store = _RedisStore(name) if shared else _LocalStore()
+        _registry.append(self)
+
+    def _field(self, labels: dict, suffix: str = "") -> str:
+        return json.dumps([[str(labels[name]) for name in self.labelnames], suffix])
+
+    def _series(self):
+        for field, value in sorted(self._store.snapshot().items()):
+            label_values, suffix = json.loads(field)
+            yield label_values, suffix, value
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count.
+    """
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount:
+            self._store.add({self._field(labels): amount})
+
+    def values(self) -> dict:
+        """
+        Returns the current counts keyed by label value tuples.
+        """
+        return {tuple(label_values): value for label_values, _, value in self._series()}
+
+    def render(self) -> list:
+        lines = super().render()
+        for label_values, value in self.values().items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, label_values)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets, with their sum and count.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS, shared: bool = False):
+        super().__init__(name, help, labelnames, shared)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        index = bisect_left(self.buckets, value)
+        bucket = str(self.buckets[index]) if index < len(self.buckets) else "+Inf"
+        self._store.add({
+            self._field(labels, f"bucket:{bucket}"): 1,
+            self._field(labels, "sum"): value,
+            self._field(labels, "count"): 1,
+        })
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the duration of the enclosed block, in seconds.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list:
+        series = {}
+        for label_values, suffix, value in self._series():
+            series.setdefault(tuple(label_values), {})[suffix] = value
+
+        lines = super().render()
+        for label_values, values in series.items():
+            cumulative = 0.0
+            for bucket in [str(bucket) for bucket in self.buckets] + ["+Inf"]:
+                cumulative += values.get(f"bucket:{bucket}", 0.0)
+                labels = _format_labels(self.labelnames, label_values, f'le="{bucket}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, label_values)
+            lines.append(f"{self.name}_sum{labels} {values.get('sum', 0.0)}")
+            lines.append(f"{self.name}_count{labels} {values.get('count', 0.0)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Current value, read when the metrics are scraped.
+
+    Attributes:
+        collect (Callable[[], dict]): Returns the current values keyed by label value tuples.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames, collect):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+
+    def render(self) -> list:
+        lines = super().render()
+        try:
+            values = self.collect()
+        except redis.RedisError as e:
+            logger.warning("Error reading metric %s: %s", self.name, e)
+            values = {}
+        for label_values, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, label_values)} {value}")
+        return lines
+
+
+def render() -> str:
+    """
+    Renders every metric in the Prometheus text exposition format.
+    """
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+# API requests
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to produce a response, per route handler", ["method", "handler", "status"]
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ["handler"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request", ["handler"]
+)
+
+# SQL statements issued by this process
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "SQL statement execution time", ["engine"])
+
+# Caches
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests_total", "Response cache lookups by result (hit, miss, bypass)", ["result"]
+)
+PREDICTION_CACHE_LOOKUPS = Counter(
+    "prediction_cache_lookups_total", "Prediction cache lookups per field, by result (hit, miss)", ["result"],
+    shared=True,
+)
+
+# Celery tasks and the LLM (recorded by workers)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Celery task run time", ["task", "state"], shared=True
+)
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds", "Latency of single model calls, by outcome (ok, error, timeout)", ["outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120), shared=True,
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens processed by the model, by kind (prompt, completion)", ["kind"], shared=True)
+CLASSIFIER_PREDICTIONS = Counter("classifier_predictions_total", "Reviews labelled, per backend", ["backend"], shared=True)
+CLASSIFIER_ESCALATIONS = Counter(
+    "classifier_escalations_total", "Reviews passed on to the fallback backend for low confidence", ["backend"],
+    shared=True,
+)
+CLASSIFIER_ERRORS = Counter("classifier_errors_total", "Failed predictions, per backend", ["backend"], shared=True)
+CLASSIFIER_SECONDS = Counter("classifier_seconds_total", "Time spent classifying, per backend", ["backend"], shared=True)
+
+# Queues
+def _celery_queue_lengths() -> dict:
+    # Messages of each priority step are kept in a separate list
+    pipeline = get_redis().pipeline(transaction=False)
+    for queue in METRICS_CELERY_QUEUES:
+        for key in queue_keys(queue):
+            pipeline.llen(key)
+    lengths = iter(pipeline.execute())
+    return {(queue,): sum(next(lengths) for _ in queue_keys(queue)) for queue in METRICS_CELERY_QUEUES}
+
+
+Gauge("celery_queue_length", "Messages waiting in each Celery queue (all priorities)", ["queue"], _celery_queue_lengths)
+Gauge("enrichment_in_flight", "Reviews queued or being enriched", [], lambda: {(): pending_count()})
+
+
+# SQL statistics of the current API request: {"queries": int, "seconds": float}
+_request_queries = ContextVar("request_queries", default=None)
+
+
+def start_query_tracking() -> dict:
+    """
+    Starts counting the SQL statements executed in the current request (context).
+
+    Returns:
+        dict: Running totals, updated in place by the engine hooks.
+    """
+    stats = {"queries": 0, "seconds": 0.0}
+    _request_queries.set(stats)
+    return stats
+
+
+def observe_request(method: str, handler: str, status: int, seconds: float, queries: dict):
+    """
+    Records one API request and the SQL it executed.
+    """
+    HTTP_REQUEST_DURATION.observe(seconds, method=method, handler=handler, status=status)
+    HTTP_REQUEST_DB_QUERIES.observe(queries["queries"], handler=handler)
+    HTTP_REQUEST_DB_SECONDS.observe(queries["seconds"], handler=handler)
+
+
+def instrument_engine(engine, name: str):
+    """
+    Times every SQL statement executed through a (sync) engine.
+
+    Args:
+        engine (Engine): The engine; pass `async_engine.sync_engine` for async engines.
+        name (str): Value of the `engine` label.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        DB_QUERY_DURATION.observe(elapsed, engine=name)
+        stats = _request_queries.get()
+        if stats is not None:
+            stats["queries"] += 1
+            stats["seconds"] += elapsed
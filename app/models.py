@@ -1,10 +1,29 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func
+from sqlalchemy import DDL, Column, Integer, String, Text, ForeignKey, Date, DateTime, Boolean, Float, Index, and_, event, func, false, or_, true
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.ext.declarative import declarative_base
 
 # Declarative base for SQLAlchemy ORM models
 Base = declarative_base()
 
+# SQLite stores datetimes as text and compares them as strings. `func.now()` (CURRENT_TIMESTAMP)
+# writes "YYYY-MM-DD HH:MM:SS", so bound parameters must use the same format for range
+# comparisons (e.g. keyset pagination on created_at) to order correctly.
+Timestamp = DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
+
+def timestamp_precision(value, dialect_name: str):
+    """
+    Truncates a datetime to the precision a Timestamp column stores on the dialect (whole seconds
+    on SQLite), so values can be compared in Python with what will be read back.
+    """
+    if value is not None and dialect_name == "sqlite":
+        return value.replace(microsecond=0)
+    return value
+
 
 class Category(Base):
     """
@@ -23,6 +42,7 @@ class Category(Base):
     description = Column(Text)
 
     reviews = relationship("ReviewHistory", back_populates="category")
+    stats = relationship("CategoryStats", back_populates="category", uselist=False)
 
 
 class ReviewHistory(Base):
@@ -39,9 +59,19 @@ class ReviewHistory(Base):
         category_id (int): Foreign key linking to the category of the review.
         created_at (datetime): Timestamp when the review was created.
         updated_at (datetime): Timestamp when the review was last updated.
+        is_latest (bool): True only for the current (most recent) version of each review_id.
+        rolled_up (bool): True once the version is counted in the CategoryTrendBucket rollups.
         category (Category): Relationship to the Category model.
     """
     __tablename__ = "ReviewHistory"
+    __table_args__ = (
+        # Lookup of the current version of a review when a new version is inserted
+        Index("ix_ReviewHistory_review_id_is_latest", "review_id", "is_latest"),
+        # Full history of one review in version order
+        Index("ix_ReviewHistory_review_id_created_at", "review_id", "created_at"),
+        # Keyset pagination over the latest versions of a category is a pure index range seek
+        Index("ix_ReviewHistory_category_latest_created_at_id", "category_id", "is_latest", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     text = Column(String, nullable=True)
@@ -50,12 +80,203 @@ class ReviewHistory(Base):
     tone = Column(String(255), nullable=True)
     sentiment = Column(String(255), nullable=True)
     category_id = Column(Integer, ForeignKey("Category.id"))
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at = Column(Timestamp, default=func.now())
+    updated_at = Column(Timestamp, default=func.now(), onupdate=func.now())
+    is_latest = Column(Boolean, nullable=False, default=False, server_default=false())
+    rolled_up = Column(Boolean, nullable=False, default=False, server_default=false())
 
     category = relationship("Category", back_populates="reviews")
 
 
+# Current version of each review
+LATEST = ReviewHistory.is_latest == true()
+
+# At most one latest version per review: concurrent writers promoting versions of the same review
+# conflict on this index instead of both leaving a latest row (and counting the review twice)
+Index(
+    "ix_ReviewHistory_latest_review_id",
+    ReviewHistory.review_id,
+    unique=True,
+    sqlite_where=LATEST,
+    postgresql_where=LATEST,
+)
+
+# Latest versions still waiting for tone and/or sentiment
+UNENRICHED = and_(
+    ReviewHistory.is_latest == true(),
+    or_(ReviewHistory.tone.is_(None), ReviewHistory.sentiment.is_(None)),
+)
+
+# Partial index over the (small) set of unenriched latest versions, used by the enrichment scheduler
+Index(
+    "ix_ReviewHistory_unenriched",
+    ReviewHistory.category_id,
+    ReviewHistory.created_at,
+    sqlite_where=UNENRICHED,
+    postgresql_where=UNENRICHED,
+)
+
+
+class CategoryStats(Base):
+    """
+    Precomputed rating aggregates over the latest review versions of a category.
+
+    Rows are maintained incrementally whenever a review version is added or superseded,
+    so the trends endpoint can read the top categories from an index instead of scanning history.
+
+    Attributes:
+        category_id (int): Primary key and foreign key to the Category.
+        stars_sum (int): Running sum of stars across the latest review versions.
+        review_count (int): Number of latest review versions in the category.
+        average_stars (float): stars_sum / review_count, stored so it can be indexed.
+        category (Category): Relationship to the Category model.
+    """
+    __tablename__ = "CategoryStats"
+    __table_args__ = (
+        Index("ix_CategoryStats_average_stars", "average_stars"),
+    )
+
+    category_id = Column(Integer, ForeignKey("Category.id"), primary_key=True)
+    stars_sum = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    average_stars = Column(Float, nullable=False, default=0.0)
+
+    category = relationship("Category", back_populates="stats")
+
+
+# Versions not yet counted in the trend rollups
+NOT_ROLLED_UP = ReviewHistory.rolled_up == false()
+
+# Partial index over the (small) set of versions waiting for the trend rollup task
+Index(
+    "ix_ReviewHistory_not_rolled_up",
+    ReviewHistory.id,
+    sqlite_where=NOT_ROLLED_UP,
+    postgresql_where=NOT_ROLLED_UP,
+)
+
+
+# Text search configuration (stemming and stop words) of the full-text index on PostgreSQL
+SEARCH_CONFIG = "english"
+
+# Full-text index over the text of the latest version of each review, kept in sync by the database
+# on every insert, promotion and demotion of a version, whichever code path writes it:
+# - SQLite: an FTS5 table (rowid = ReviewHistory.id) maintained by triggers;
+# - PostgreSQL: a partial GIN expression index, used by queries repeating the same expression.
+SEARCH_DDL = {
+    "sqlite": [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS "ReviewSearch" USING fts5(text, tokenize = 'porter unicode61')""",
+        """CREATE TRIGGER IF NOT EXISTS "ReviewSearch_insert" AFTER INSERT ON "ReviewHistory"
+        WHEN new.is_latest BEGIN
+            INSERT INTO "ReviewSearch" (rowid, text) VALUES (new.id, new.text);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS "ReviewSearch_update" AFTER UPDATE OF is_latest, text ON "ReviewHistory"
+        WHEN old.is_latest OR new.is_latest BEGIN
+            DELETE FROM "ReviewSearch" WHERE rowid = old.id;
+            INSERT INTO "ReviewSearch" (rowid, text) SELECT new.id, new.text WHERE new.is_latest;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS "ReviewSearch_delete" AFTER DELETE ON "ReviewHistory"
+        WHEN old.is_latest BEGIN
+            DELETE FROM "ReviewSearch" WHERE rowid = old.id;
+        END""",
+    ],
+    "postgresql": [
+        f"""CREATE INDEX IF NOT EXISTS "ix_ReviewHistory_latest_text_search" ON "ReviewHistory"
+        USING gin (to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(text, ''))) WHERE is_latest""",
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(ReviewHistory.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+
+
+class CategoryTrendBucket(Base):
+    """
+    Rating events of one time bucket of a category.
+
+    Every review version is a rating event counted at its creation time: an edit counts in the
+    bucket it was made in, and the version it supersedes stays counted in its own bucket. The
+    buckets therefore chart rating activity, not the ratings reviews currently have (see
+    CategoryStats). Rows are added to incrementally by the trend rollup task, one row per
+    granularity, category and bucket, so rating history is read without scanning ReviewHistory.
+
+    Attributes:
+        granularity (str): Bucket size: "day", "week" (starting on Monday) or "month".
+        category_id (int): Foreign key to the Category.
+        bucket_start (date): First day (UTC) of the bucket.
+        stars_sum (int): Sum of stars of the versions created in the bucket.
+        rating_count (int): Number of versions (rating events) created in the bucket.
+    """
+    __tablename__ = "CategoryTrendBucket"
+
+    granularity = Column(String(8), primary_key=True)
+    category_id = Column(Integer, ForeignKey("Category.id"), primary_key=True)
+    bucket_start = Column(Date, primary_key=True)
+    stars_sum = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+
+
+class PredictionCache(Base):
+    """
+    Caches LLM predictions by content, so unchanged or reverted review versions skip inference.
+
+    Attributes:
+        key (str): SHA-256 of (prompt version, model name, field, text, stars).
+        field (str): The predicted field ("tone" or "sentiment").
+        value (str): The cached prediction.
+        hits (int): Number of times the entry has been reused.
+        last_used_at (datetime): Last time the entry was written or reused; drives LRU eviction.
+    """
+    __tablename__ = "PredictionCache"
+    __table_args__ = (
+        Index("ix_PredictionCache_last_used_at", "last_used_at"),
+    )
+
+    key = Column(String(64), primary_key=True)
+    field = Column(String(32), nullable=False)
+    value = Column(String(255), nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    last_used_at = Column(Timestamp, nullable=False, default=func.now())
+
+
+class ReviewHistoryArchive(Base):
+    """
+    Superseded review versions moved out of ReviewHistory by the archival job.
+
+    Rows keep their ReviewHistory id and columns, so the full history of a review can be
+    reassembled from both tables. Archived versions are never the latest version of a review.
+
+    Attributes:
+        id (int): Primary key; the id the version had in ReviewHistory.
+        text (str): Review text (can be null).
+        stars (int): Star rating.
+        review_id (str): Identifier of the review the version belongs to.
+        tone (str): The tone of the review.
+        sentiment (str): The sentiment of the review.
+        category_id (int): Foreign key linking to the category of the review.
+        created_at (datetime): Timestamp when the version was created.
+        updated_at (datetime): Timestamp when the version was last updated.
+        archived_at (datetime): Timestamp when the version was archived.
+    """
+    __tablename__ = "ReviewHistoryArchive"
+    __table_args__ = (
+        # Full history of one review in version order
+        Index("ix_ReviewHistoryArchive_review_id_created_at", "review_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    text = Column(String, nullable=True)
+    stars = Column(Integer, nullable=False)
+    review_id = Column(String(255), nullable=False)
+    tone = Column(String(255), nullable=True)
+    sentiment = Column(String(255), nullable=True)
+    category_id = Column(Integer, ForeignKey("Category.id"))
+    created_at = Column(Timestamp)
+    updated_at = Column(Timestamp)
+    archived_at = Column(Timestamp, default=func.now())
+
+
 class AccessLog(Base):
     """
     Represents an access log entry for tracking API calls or events.
@@ -63,8 +284,13 @@ class AccessLog(Base):
     Attributes:
         id (int): Primary key, auto-incremented.
         text (str): Description of the log event (required).
+        created_at (datetime): Timestamp when the entry was written; drives retention.
     """
     __tablename__ = "AccessLog"
+    __table_args__ = (
+        Index("ix_AccessLog_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     text = Column(String, nullable=False)
+    created_at = Column(Timestamp, default=func.now())
@@ -0,0 +1,87 @@
+import base64
+import json
+import os
+from datetime import datetime
+from fastapi import HTTPException
+
+# Default and server-side maximum number of reviews returned per page
+DEFAULT_PAGE_SIZE = int(os.getenv("REVIEWS_DEFAULT_PAGE_SIZE", "3"))
+MAX_PAGE_SIZE = int(os.getenv("REVIEWS_MAX_PAGE_SIZE", "100"))
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """
+    Encodes the keyset position of the last row in a page into an opaque cursor.
+
+    Args:
+        created_at (datetime): `created_at` of the last row returned.
+        id (int): `id` of the last row returned (breaks ties between equal timestamps).
+
+    Returns:
+        str: URL-safe cursor string.
+    """
+    return _encode_payload({"created_at": created_at.isoformat(), "id": id})
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The opaque cursor received from the client.
+
+    Returns:
+        tuple: (created_at, id) of the last row of the previous page.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed.
+    """
+    try:
+        payload = _decode_payload(cursor)
+        return datetime.fromisoformat(payload["created_at"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_rank_cursor(score: float, id: int) -> str:
+    """
+    Encodes the keyset position of the last row in a page of ranked (search) results.
+
+    Args:
+        score (float): Relevance score of the last row returned (lower ranks first).
+        id (int): `id` of the last row returned (breaks ties between equal scores).
+
+    Returns:
+        str: URL-safe cursor string.
+    """
+    return _encode_payload({"score": score, "id": id})
+
+
+def decode_rank_cursor(cursor: str) -> tuple:
+    """
+    Decodes a cursor produced by `encode_rank_cursor`.
+
+    Args:
+        cursor (str): The opaque cursor received from the client.
+
+    Returns:
+        tuple: (score, id) of the last row of the previous page.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed.
+    """
+    try:
+        payload = _decode_payload(cursor)
+        return float(payload["score"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _encode_payload(payload: dict) -> str:
+    data = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def _decode_payload(cursor: str) -> dict:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
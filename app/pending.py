@@ -0,0 +1,95 @@
+import logging
+import os
+import time
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Redis instance shared with Celery (broker and result backend)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Seconds after which a claim expires, so a review whose task died is retried eventually
+ENRICHMENT_PENDING_TTL = int(os.getenv("ENRICHMENT_PENDING_TTL", "600"))
+
+# Sorted set of claimed review IDs scored by claim expiry, used to count in-flight enrichment
+INFLIGHT_KEY = "enrichment:inflight"
+
+_client = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Returns the lazily created Redis client used for enrichment bookkeeping.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(REDIS_URL)
+    return _client
+
+
+def _pending_key(id: int) -> str:
+    return f"enrichment:pending:{id}"
+
+
+def claim_pending(ids) -> list:
+    """
+    Marks reviews as queued for enrichment, returning only those that were not already queued.
+
+    Each claim is a `SET NX EX` on a per-review key, so concurrent API processes cannot queue
+    the same review twice while its job is queued or running.
+    If Redis is unavailable every ID is returned, so enrichment still happens.
+
+    Args:
+        ids (Iterable[int]): IDs of ReviewHistory entries missing tone and/or sentiment.
+
+    Returns:
+        list[int]: The IDs claimed by this call, which should be dispatched.
+    """
+    ids = list(ids)
+    if not ids:
+        return []
+
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        for id in ids:
+            pipeline.set(_pending_key(id), 1, nx=True, ex=ENRICHMENT_PENDING_TTL)
+        claimed = [id for id, result in zip(ids, pipeline.execute()) if result]
+        if claimed:
+            expires_at = time.time() + ENRICHMENT_PENDING_TTL
+            get_redis().zadd(INFLIGHT_KEY, {str(id): expires_at for id in claimed})
+    except redis.RedisError as e:
+        logger.warning("Error claiming pending enrichment jobs: %s", e)
+        return ids
+
+    return claimed
+
+
+def release_pending(ids):
+    """
+    Clears the queued markers of reviews whose enrichment finished (successfully or not).
+
+    Args:
+        ids (Iterable[int]): IDs of ReviewHistory entries that were processed.
+    """
+    ids = list(ids)
+    keys = [_pending_key(id) for id in ids]
+    if not keys:
+        return
+
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        pipeline.delete(*keys)
+        pipeline.zrem(INFLIGHT_KEY, *[str(id) for id in ids])
+        pipeline.execute()
+    except redis.RedisError as e:
+        logger.warning("Error releasing pending enrichment jobs: %s", e)
+
+
+def pending_count() -> int:
+    """
+    Returns the number of reviews currently queued or being enriched (expired claims excluded).
+    """
+    pipeline = get_redis().pipeline(transaction=False)
+    pipeline.zremrangebyscore(INFLIGHT_KEY, "-inf", time.time())
+    pipeline.zcard(INFLIGHT_KEY)
+    return pipeline.execute()[1]
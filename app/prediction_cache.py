@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+from .metrics import PREDICTION_CACHE_LOOKUPS
+from .models import PredictionCache
+from .prompts import LLM_MODEL, PROMPT_VERSION
+
+# Maximum number of cached predictions kept; least recently used entries beyond it are evicted
+# periodically (see the evict_prediction_cache task), so the table can briefly exceed it
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "100000"))
+
+
+
+def prediction_key(field: str, text: str, stars: int) -> str:
+    """
+    Builds the cache key for one predicted field of a review's content.
+
+    Args:
+        field (str): "tone" or "sentiment".
+        text (str): The review text.
+        stars (int): The review rating.
+
+    Returns:
+        str: Hex SHA-256 over the prompt version, model name, field, text and stars.
+    """
+    payload = json.dumps([PROMPT_VERSION, LLM_MODEL, field, text, stars], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_cached_predictions(session: Session, fields, text: str, stars: int) -> dict:
+    """
+    Looks up cached predictions for the given fields of a review, refreshing the LRU position of hits.
+
+    Args:
+        session (Session): Database session (refreshes join its transaction).
+        fields (Iterable[str]): Fields to look up ("tone" and/or "sentiment").
+        text (str): The review text.
+        stars (int): The review rating.
+
+    Returns:
+        dict: Cached values keyed by field; fields without a cached value are absent.
+    """
+    keys = {prediction_key(field, text, stars): field for field in fields}
+    if not keys:
+        return {}
+
+    rows = session.execute(
+        select(PredictionCache.key, PredictionCache.value).where(PredictionCache.key.in_(keys))
+    ).all()
+
+    if rows:
+        session.execute(
+            update(PredictionCache)
+            .where(PredictionCache.key.in_([row.key for row in rows]))
+            .values(hits=PredictionCache.hits + 1, last_used_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+
+    # Hit/miss counters (one count per field looked up)
+    PREDICTION_CACHE_LOOKUPS.inc(len(rows), result="hit")
+    PREDICTION_CACHE_LOOKUPS.inc(len(keys) - len(rows), result="miss")
+
+    return {keys[row.key]: row.value for row in rows}
+
+
+def store_predictions(session: Session, predictions: dict, text: str, stars: int):
+    """
+    Stores freshly generated predictions for a review's content.
+
+    Args:
+        session (Session): Database session (the entries are written on its next flush).
+        predictions (dict): Predicted values keyed by field.
+        text (str): The review text.
+        stars (int): The review rating.
+    """
+    for field, value in predictions.items():
+        session.merge(PredictionCache(key=prediction_key(field, text, stars), field=field, value=value))
+
+
+def evict_predictions(session: Session, max_entries: int = PREDICTION_CACHE_MAX_ENTRIES) -> int:
+    """
+    Evicts the least recently used cache entries beyond `max_entries`.
+
+    Counting the entries scans the table, so this runs from the periodic maintenance task rather
+    than after every store. The caller is responsible for committing the session.
+
+    Args:
+        session (Session): Database session.
+        max_entries (int): Number of entries to keep.
+
+    Returns:
+        int: Number of entries evicted.
+    """
+    excess = session.execute(select(func.count()).select_from(PredictionCache)).scalar() - max_entries
+    if excess <= 0:
+        return 0
+
+    oldest = select(PredictionCache.key).order_by(PredictionCache.last_used_at.asc()).limit(excess)
+    session.execute(
+        delete(PredictionCache)
+        .where(PredictionCache.key.in_(oldest))
+        .execution_options(synchronize_session=False)
+    )
+    return excess
+
+
+def fill_from_cache(session: Session, review) -> bool:
+    """
+    Copies cached tone/sentiment onto a review whose content has been predicted before.
+
+    Args:
+        session (Session): Database session.
+        review (ReviewHistory): The review to fill in place.
+
+    Returns:
+        bool: True if the review no longer needs any inference.
+    """
+    missing = [field for field in ("tone", "sentiment") if not getattr(review, field)]
+    for field, value in get_cached_predictions(session, missing, review.text, review.stars).items():
+        setattr(review, field, value)
+    return bool(review.tone) and bool(review.sentiment)
@@ -0,0 +1,334 @@
+import os
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import Float, case, cast, delete, event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .models import LATEST, CategoryStats, ReviewHistory, timestamp_precision
+from .prediction_cache import fill_from_cache
+from .response_cache import mark_changed_categories
+
+# Attempts at a transaction that adds review versions, when it races another writer of the same reviews
+LATEST_VERSION_ATTEMPTS = int(os.getenv("LATEST_VERSION_ATTEMPTS", "3"))
+
+
+class LatestVersionConflict(Exception):
+    """
+    Raised when the stored latest version of a review was superseded by a concurrent transaction
+    between reading and demoting it.
+    """
+
+
+def _version_sort_key(review: ReviewHistory):
+    """
+    Sort key used to decide which of several versions of a review is the latest.
+
+    A version whose `created_at` has not been set yet will receive `func.now()` on insert,
+    so it is treated as newer than anything already stored.
+    """
+    return review.created_at or datetime.max
+
+
+@event.listens_for(Session, "before_flush")
+def maintain_latest_versions(session: Session, flush_context, instances):
+    """
+    Keeps the `ReviewHistory.is_latest` pointer in sync whenever new versions are flushed.
+
+    - Pending versions are grouped by `review_id` and the newest one is chosen.
+    - It is compared against the currently stored latest version (ties go to the new row).
+    - If the new version wins, the previous latest row is demoted and the new one is promoted.
+    - CategoryStats are moved from the superseded version to the new one.
+    - New versions whose content was predicted before get tone/sentiment copied from the cache.
+
+    Args:
+        session (Session): The session being flushed.
+        flush_context: SQLAlchemy flush context (unused).
+        instances: Deprecated SQLAlchemy argument (unused).
+    """
+    # Grouping the pending versions by review_id, preserving insertion order; timestamps are
+    # truncated to what the database stores, so they compare equal to the rows read back
+    dialect_name = session.get_bind(mapper=ReviewHistory).dialect.name
+    pending = {}
+    for obj in session.new:
+        if isinstance(obj, ReviewHistory):
+            obj.is_latest = False
+            obj.created_at = timestamp_precision(obj.created_at, dialect_name)
+            pending.setdefault(obj.review_id, []).append(obj)
+
+    if not pending:
+        return
+
+    with session.no_autoflush:
+        # Versions with unchanged (or reverted) content reuse earlier predictions without inference
+        for versions in pending.values():
+            for version in versions:
+                if not version.tone or not version.sentiment:
+                    fill_from_cache(session, version)
+
+        for review_id, versions in pending.items():
+            # Newest pending version; later additions win on equal timestamps
+            candidate = max(reversed(versions), key=_version_sort_key)
+
+            current = session.execute(
+                select(
+                    ReviewHistory.id,
+                    ReviewHistory.created_at,
+                    ReviewHistory.stars,
+                    ReviewHistory.category_id,
+                ).where(
+                    ReviewHistory.review_id == review_id,
+                    ReviewHistory.is_latest.is_(True),
+                )
+            ).first()
+
+            if current is not None and candidate.created_at is not None and candidate.created_at < current.created_at:
+                # An older version is being back-filled; the stored latest stays current
+                continue
+
+            if current is not None:
+                # Demoting the previous latest version without touching its updated_at; if another
+                # transaction demoted it first, its CategoryStats were already moved
+                demoted = session.execute(
+                    update(ReviewHistory)
+                    .where(ReviewHistory.id == current.id, LATEST)
+                    .values(is_latest=False, updated_at=ReviewHistory.updated_at)
+                    .execution_options(synchronize_session="fetch")
+                )
+                if demoted.rowcount != 1:
+                    raise LatestVersionConflict(f"Latest version of review {review_id} changed concurrently")
+                adjust_category_stats(session, current.category_id, -current.stars, -1)
+                # The superseded version may belong to another category whose cached pages now change
+                mark_changed_categories(session, [current.category_id])
+
+            candidate.is_latest = True
+            adjust_category_stats(session, candidate.category_id, candidate.stars, 1)
+
+
+def apply_bulk_versions(session: Session, rows: list):
+    """
+    Maintains the projections for a chunk of versions that is about to be inserted with a Core
+    (executemany) insert, which bypasses the `before_flush` hook.
+
+    - Sets `is_latest` on each row dict, using the same rules as `maintain_latest_versions`, and
+      truncates `created_at` to the stored precision.
+    - Demotes the previously stored latest versions that are superseded.
+    - Applies the resulting CategoryStats changes and marks the affected categories for cache invalidation.
+
+    A concurrent chunk promoting versions of the same reviews makes this raise LatestVersionConflict,
+    or the insert fail on the unique latest-version index; run it through `commit_versions`.
+
+    Args:
+        session (Session): Database session the chunk will be inserted with.
+        rows (list[dict]): Column values of the new versions; each must have `created_at` set.
+    """
+    current = {
+        row.review_id: row
+        for row in session.execute(
+            select(
+                ReviewHistory.id,
+                ReviewHistory.review_id,
+                ReviewHistory.created_at,
+                ReviewHistory.stars,
+                ReviewHistory.category_id,
+            ).where(
+                ReviewHistory.review_id.in_({row["review_id"] for row in rows}),
+                ReviewHistory.is_latest.is_(True),
+            )
+        )
+    }
+
+    # Newest version of each review within the chunk; later rows win on equal timestamps (compared
+    # at the precision the database stores them with)
+    dialect_name = session.get_bind(mapper=ReviewHistory).dialect.name
+    candidates = {}
+    for row in rows:
+        row["is_latest"] = False
+        row["created_at"] = timestamp_precision(row["created_at"], dialect_name)
+        best = candidates.get(row["review_id"])
+        if best is None or row["created_at"] >= best["created_at"]:
+            candidates[row["review_id"]] = row
+
+    demoted = []
+    deltas = defaultdict(lambda: [0, 0])
+    for review_id, row in candidates.items():
+        stored = current.get(review_id)
+        if stored is not None and row["created_at"] < stored.created_at:
+            # An older version is being back-filled; the stored latest stays current
+            continue
+
+        row["is_latest"] = True
+        deltas[row["category_id"]][0] += row["stars"]
+        deltas[row["category_id"]][1] += 1
+        if stored is not None:
+            demoted.append(stored.id)
+            deltas[stored.category_id][0] -= stored.stars
+            deltas[stored.category_id][1] -= 1
+
+    if demoted:
+        # Demoting the superseded versions without touching their updated_at
+        result = session.execute(
+            update(ReviewHistory)
+            .where(ReviewHistory.id.in_(demoted), LATEST)
+            .values(is_latest=False, updated_at=ReviewHistory.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(demoted):
+            raise LatestVersionConflict("Latest versions of the chunk changed concurrently")
+
+    for category_id, (stars_delta, count_delta) in deltas.items():
+        if stars_delta or count_delta:
+            adjust_category_stats(session, category_id, stars_delta, count_delta)
+
+    mark_changed_categories(session, deltas.keys())
+
+
+def commit_versions(session: Session, write, attempts: int = LATEST_VERSION_ATTEMPTS):
+    """
+    Runs `write(session)` and commits, retrying the whole transaction when it raced a concurrent
+    transaction adding versions of the same reviews.
+
+    The loser of such a race either finds its latest version already demoted (LatestVersionConflict)
+    or violates the unique index on the latest version of each review (IntegrityError). The
+    transaction is rolled back, so `write` must add its versions again on every attempt, and the
+    is_latest pointer and CategoryStats are recomputed against the winner's committed rows.
+
+    Args:
+        session (Session): Database session.
+        write (Callable[[Session], Any]): Adds the new versions to the session.
+        attempts (int): Maximum number of attempts before the error is raised.
+
+    Returns:
+        The value returned by `write`.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            result = write(session)
+            session.commit()
+            return result
+        except (IntegrityError, LatestVersionConflict):
+            session.rollback()
+            if attempt == attempts:
+                raise
+
+
+def adjust_category_stats(session: Session, category_id: int, stars_delta: int, count_delta: int):
+    """
+    Applies an incremental change to the CategoryStats row of a category.
+
+    Args:
+        session (Session): Database session (the change joins its transaction).
+        category_id (int): The category to adjust; reviews without a category are ignored.
+        stars_delta (int): Amount to add to the running sum of stars.
+        count_delta (int): Amount to add to the number of latest reviews.
+    """
+    if category_id is None:
+        return
+
+    new_sum = CategoryStats.stars_sum + stars_delta
+    new_count = CategoryStats.review_count + count_delta
+    result = session.execute(
+        update(CategoryStats)
+        .where(CategoryStats.category_id == category_id)
+        .values(
+            stars_sum=new_sum,
+            review_count=new_count,
+            average_stars=case((new_count > 0, cast(new_sum, Float) / new_count), else_=0.0),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    # First latest review in this category: creating its aggregate row
+    if result.rowcount == 0:
+        session.execute(
+            insert(CategoryStats).values(
+                category_id=category_id,
+                stars_sum=stars_delta,
+                review_count=count_delta,
+                average_stars=stars_delta / count_delta if count_delta > 0 else 0.0,
+            )
+        )
+
+
+def compute_category_stats(session: Session) -> dict:
+    """
+    Recomputes the category aggregates from scratch out of the latest ReviewHistory versions.
+
+    Args:
+        session (Session): Database session.
+
+    Returns:
+        dict: Mapping of category_id to a (stars_sum, review_count) tuple.
+    """
+    rows = session.execute(
+        select(
+            ReviewHistory.category_id,
+            func.sum(ReviewHistory.stars),
+            func.count(ReviewHistory.id),
+        )
+        .where(ReviewHistory.is_latest.is_(True), ReviewHistory.category_id.is_not(None))
+        .group_by(ReviewHistory.category_id)
+    ).all()
+    return {category_id: (int(stars_sum), count) for category_id, stars_sum, count in rows}
+
+
+def verify_category_stats(session: Session) -> list:
+    """
+    Compares the stored CategoryStats against a full recomputation.
+
+    Args:
+        session (Session): Database session.
+
+    Returns:
+        list[dict]: One entry per drifted category with the expected and stored values.
+    """
+    expected = compute_category_stats(session)
+    stored = {
+        row.category_id: (row.stars_sum, row.review_count)
+        for row in session.execute(
+            select(CategoryStats.category_id, CategoryStats.stars_sum, CategoryStats.review_count)
+        )
+    }
+
+    drift = []
+    for category_id in sorted(expected.keys() | stored.keys()):
+        want = expected.get(category_id, (0, 0))
+        have = stored.get(category_id, (0, 0))
+        if want != have:
+            drift.append({
+                "category_id": category_id,
+                "expected_stars_sum": want[0],
+                "expected_review_count": want[1],
+                "stored_stars_sum": have[0],
+                "stored_review_count": have[1],
+            })
+    return drift
+
+
+def rebuild_category_stats(session: Session) -> int:
+    """
+    Replaces every CategoryStats row with values recomputed from ReviewHistory.
+
+    The caller is responsible for committing the session.
+
+    Args:
+        session (Session): Database session.
+
+    Returns:
+        int: Number of category rows written.
+    """
+    expected = compute_category_stats(session)
+    session.execute(delete(CategoryStats))
+    if expected:
+        session.execute(
+            insert(CategoryStats),
+            [
+                {
+                    "category_id": category_id,
+                    "stars_sum": stars_sum,
+                    "review_count": count,
+                    "average_stars": stars_sum / count,
+                }
+                for category_id, (stars_sum, count) in expected.items()
+            ],
+        )
+    return len(expected)
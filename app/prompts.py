@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+
+# Ollama model used for tone/sentiment predictions
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3.2")
+
+# Define the LLM template
+template = """You will be asked to generate either sentiment or tone(positive,negative or neutral) for a review. Use the
+            text provided to you and stars(stars are equivalent to the rating,1 being the lowest and 10 being the highest) to determine the sentiment or tone
+
+            {question}"""
+
+# Questions asked to the LLM for each kind of prediction
+TONE_QUESTION = "Generate the tone for this review. The text of the review '{text}' and the rating given is {stars}."
+SENTIMENT_QUESTION = "Generate the sentiment for this review. The text of the review is '{text}' and the rating given is {stars}."
+# Asks for both fields in one structured response so a review costs a single inference
+COMBINED_QUESTION = (
+    "Generate both the tone and the sentiment for this review. The text of the review is '{text}' "
+    "and the rating given is {stars}. Respond only with a JSON object of the form "
+    '{{"tone": "<tone>", "sentiment": "<sentiment>"}} and nothing else.'
+)
+
+# Fingerprint of the prompts above; cached predictions are invalidated whenever any prompt changes
+PROMPT_VERSION = hashlib.sha256(
+    "\n".join([template, TONE_QUESTION, SENTIMENT_QUESTION, COMBINED_QUESTION]).encode()
+).hexdigest()[:12]
+
+
+def parse_combined_prediction(raw: str):
+    """
+    Parses the JSON answer to COMBINED_QUESTION.
+
+    Models often wrap the object in prose or code fences, so the outermost `{...}` is extracted first.
+
+    Args:
+        raw (str): Raw LLM output.
+
+    Returns:
+        dict | None: {"tone": str, "sentiment": str}, or None if the output could not be parsed.
+    """
+    start, end = raw.find("{"), raw.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        parsed = json.loads(raw[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(parsed, dict):
+        return None
+
+    tone, sentiment = parsed.get("tone"), parsed.get("sentiment")
+    if not isinstance(tone, str) or not isinstance(sentiment, str) or not tone.strip() or not sentiment.strip():
+        return None
+    return {"tone": tone.strip(), "sentiment": sentiment.strip()}
@@ -0,0 +1,239 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import redis
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .metrics import RESPONSE_CACHE_REQUESTS
+from .models import ReviewHistory
+from .pending import get_redis
+
+logger = logging.getLogger(__name__)
+
+# "memory" (per-process TTL + LRU) or "redis" (shared between API processes)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+# Seconds a cached response is kept, and maximum number of responses kept in memory
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+# max-age advertised to clients and proxies in Cache-Control; they revalidate with If-None-Match after it
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "5"))
+
+# Generation keys: bumping one makes every cached response that depends on it unreachable
+TRENDS_GENERATION = "cache:gen:trends"
+TRENDS_HISTORY_GENERATION = "cache:gen:trends_history"
+
+
+def category_generation(category_id: int) -> str:
+    """
+    Returns the generation key of a category's review pages.
+    """
+    return f"cache:gen:category:{category_id}"
+
+
+class MemoryCacheBackend:
+    """
+    In-process response cache with per-entry TTL and least-recently-used eviction.
+
+    Attributes:
+        ttl (int): Seconds an entry stays valid.
+        max_entries (int): Maximum number of entries kept.
+    """
+
+    def __init__(self, ttl: int = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: tuple):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisCacheBackend:
+    """
+    Response cache shared by all API processes, stored in Redis with a TTL.
+
+    Attributes:
+        ttl (int): Seconds an entry stays valid.
+    """
+
+    def __init__(self, ttl: int = RESPONSE_CACHE_TTL):
+        self.ttl = ttl
+
+    def get(self, key: str):
+        value = get_redis().get(f"cache:response:{key}")
+        if value is None:
+            return None
+        etag, _, body = value.partition(b"\n")
+        return etag.decode(), body
+
+    def set(self, key: str, value: tuple):
+        etag, body = value
+        get_redis().set(f"cache:response:{key}", etag.encode() + b"\n" + body, ex=self.ttl)
+
+
+def _make_backend():
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return RedisCacheBackend()
+    return MemoryCacheBackend()
+
+
+backend = _make_backend()
+
+
+def _current_generations(generation_keys: list):
+    """
+    Reads the current generations, or returns None if Redis is unavailable (caching is then bypassed).
+    """
+    try:
+        return [int(value or 0) for value in get_redis().mget(generation_keys)]
+    except redis.RedisError as e:
+        logger.warning("Error reading response cache generations: %s", e)
+        return None
+
+
+def _lookup(key: str, generation_keys: list):
+    generations = _current_generations(generation_keys)
+    if generations is None:
+        return None, None
+    versioned_key = f"{key}|{':'.join(map(str, generations))}"
+    try:
+        return versioned_key, backend.get(versioned_key)
+    except redis.RedisError as e:
+        logger.warning("Error reading response cache: %s", e)
+        return versioned_key, None
+
+
+def _store(versioned_key: str, entry: tuple):
+    try:
+        backend.set(versioned_key, entry)
+    except redis.RedisError as e:
+        logger.warning("Error writing response cache: %s", e)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+async def cached_response(request: Request, key: str, generation_keys: list, build) -> Response:
+    """
+    Serves a JSON response from the cache, building and caching it on a miss.
+
+    - The cache key combines `key` (route and parameters) with the current generation of every
+      key in `generation_keys`, so writes invalidate by bumping a generation.
+    - Responses carry an ETag and Cache-Control; a matching If-None-Match is answered with 304.
+    - Exceptions raised by `build` (e.g. 404s) propagate and are not cached.
+
+    Args:
+        request (Request): The incoming request.
+        key (str): Route and parameters identifying the response.
+        generation_keys (list[str]): Generations the response depends on.
+        build (Callable[[], Awaitable[bytes]]): Produces the serialized JSON body on a miss.
+
+    Returns:
+        Response: The JSON response, or an empty 304 response.
+    """
+    versioned_key, entry = await run_in_threadpool(_lookup, key, generation_keys)
+    RESPONSE_CACHE_REQUESTS.inc(result="bypass" if versioned_key is None else "miss" if entry is None else "hit")
+
+    if entry is None:
+        body = await build()
+        entry = (f'"{hashlib.sha1(body).hexdigest()}"', body)
+        if versioned_key is not None:
+            await run_in_threadpool(_store, versioned_key, entry)
+
+    etag, body = entry
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={RESPONSE_CACHE_MAX_AGE}"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def invalidate_categories(category_ids):
+    """
+    Invalidates cached trends and the review pages of the given categories.
+
+    Args:
+        category_ids (Iterable[int]): Categories whose reviews were inserted or modified.
+    """
+    _bump_generations([TRENDS_GENERATION] + [category_generation(id) for id in set(category_ids) if id is not None])
+
+
+def _bump_generations(keys: list):
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        for key in keys:
+            pipeline.incr(key)
+        pipeline.execute()
+    except redis.RedisError as e:
+        logger.warning("Error invalidating response cache: %s", e)
+
+
+def mark_changed_categories(session: Session, category_ids):
+    """
+    Records categories whose cached responses must be invalidated when the session commits.
+
+    Args:
+        session (Session): The session making the change.
+        category_ids (Iterable[int]): Affected categories.
+    """
+    session.info.setdefault("changed_categories", set()).update(category_ids)
+
+
+def mark_trend_history_changed(session: Session):
+    """
+    Records that cached trend history responses must be invalidated when the session commits.
+
+    Args:
+        session (Session): The session updating the trend rollups.
+    """
+    session.info["trend_history_changed"] = True
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_changed_categories(session: Session, flush_context, instances):
+    # New versions and enriched (tone/sentiment) versions change what the endpoints return
+    mark_changed_categories(session, [
+        obj.category_id
+        for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, ReviewHistory)
+    ])
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session):
+    changed = session.info.pop("changed_categories", None)
+    if changed:
+        invalidate_categories(changed)
+    if session.info.pop("trend_history_changed", False):
+        _bump_generations([TRENDS_HISTORY_GENERATION])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session):
+    session.info.pop("changed_categories", None)
+    session.info.pop("trend_history_changed", None)
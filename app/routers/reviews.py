@@ -1,187 +1,489 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import func
-from ..database import SessionLocal
-from ..models import ReviewHistory, Category
-from ..celery_tasks import log_access_task,llm_sentiment_prediction
-from app.schemas import ReviewSchema, CategorySchemaResponse ,PaginatedReviewsResponse
-from sqlalchemy.orm import aliased
-from datetime import datetime
+import codecs
+import csv
+import io
+import json
+import tempfile
+from datetime import date, datetime
+from itertools import groupby
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import AsyncSessionLocal, get_async_db
+from ..models import ReviewHistory, Category, CategoryStats, CategoryTrendBucket
+from ..access_log import access_log_buffer
+from ..archival import review_versions_query
+from ..enrichment import record_category_view
+from app.schemas import (
+    CategorySchemaResponse, CategoryTrendHistory, CategoryTrendHistoryRow, CategoryTrendRow, PaginatedReviewRows,
+    PaginatedReviewsResponse, IngestResponse, ReviewVersion, ReviewVersionRow,
+)
+from ..ingestion import ingest_versions, parse_csv, parse_ndjson
+from ..pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, decode_rank_cursor, encode_cursor, encode_rank_cursor,
+)
+from ..response_cache import TRENDS_GENERATION, TRENDS_HISTORY_GENERATION, cached_response, category_generation
+from ..search import search_reviews_query, search_terms
+from ..trend_history import DEFAULT_TREND_BUCKETS, MAX_TREND_BUCKETS, bucket_count, bucket_start, buckets_before
 router = APIRouter()
 
+# Rows fetched per round trip by the streaming export's server-side cursor
+EXPORT_BATCH_SIZE = 1000
+# Bytes of an ingestion body kept in memory; larger bodies are spooled to a temporary file
+INGEST_SPOOL_MAX_MEMORY = 8 * 1024 * 1024
 
-def get_db():
-    """
-    Provides a database session for dependency injection.
-    Ensures the session is closed after use.
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Columns returned by the list and export endpoints (ReviewSchema fields), in CSV column order
+REVIEW_COLUMNS = [
+    ReviewHistory.id,
+    ReviewHistory.text,
+    ReviewHistory.stars,
+    ReviewHistory.review_id,
+    ReviewHistory.tone,
+    ReviewHistory.sentiment,
+    ReviewHistory.category_id,
+    ReviewHistory.created_at,
+    ReviewHistory.updated_at,
+]
+
+# Serializers for the cached JSON bodies: rows go straight from the query to JSON, without
+# hydrating ORM objects or validating data the database already constrains
+trends_adapter = TypeAdapter(list[CategoryTrendRow])
+paginated_reviews_adapter = TypeAdapter(PaginatedReviewRows)
+trend_history_adapter = TypeAdapter(list[CategoryTrendHistoryRow])
+review_versions_adapter = TypeAdapter(list[ReviewVersionRow])
 
 
 @router.get("/trends",response_model=list[CategorySchemaResponse])
-async def get_review_trends(db: Session = Depends(get_db)):
+async def get_review_trends(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Retrieves the top 5 categories based on the average stars of the latest reviews.
     
-    - The latest review is determined for each review_id.
+    - Averages and counts over the latest review versions are read from the precomputed CategoryStats.
     - Categories are ranked by the descending average of stars from their latest reviews.
-    - Saves an access log asynchronously.
+    - Saves an access log through the buffered access log writer.
+    - Served from the response cache until a review changes; supports ETag / If-None-Match.
 
     Args:
-        db (Session): Database session.
+        request (Request): The incoming request (for conditional GET headers).
+        db (AsyncSession): Async database session.
 
     Returns:
         List[CategorySchemaResponse]: A list of top 5 categories with their average stars and total reviews.
     """
     
-    # Log the access event asynchronously
-    log_access_task.delay("GET /reviews/trends")
+    # Log the access event (buffered and bulk-inserted in the background)
+    access_log_buffer.add("GET /reviews/trends")
     
     
-    # Subquery to get the latest review for each review_id
-    latest_reviews_subquery = (
-        db.query(
-            ReviewHistory.review_id,
-            func.max(ReviewHistory.created_at).label("latest_created_at"),
-        )
-        .group_by(ReviewHistory.review_id)
-        .subquery()
-    )
-    
-    # Alias for joining the subquery with ReviewHistory
-    latest_reviews = aliased(ReviewHistory)
-    
-    # Fetching top 5 categories by average stars
-    # Main query: Join latest reviews with Category and calculate aggregates
-    query = (
-        db.query(
-            Category.id.label("id"),
-            Category.name.label("name"),
-            Category.description.label("description"),
-            func.avg(latest_reviews.stars).label("average_stars"),
-            func.count(latest_reviews.id).label("total_reviews"),
+    async def build():
+        # Fetching top 5 categories by average stars
+        # The aggregates are maintained incrementally in CategoryStats, so this is an indexed top-5 lookup
+        query = (
+            select(
+                Category.id.label("id"),
+                Category.name.label("name"),
+                Category.description.label("description"),
+                CategoryStats.average_stars.label("average_stars"),
+                CategoryStats.review_count.label("total_reviews"),
+            )
+            .join(CategoryStats, Category.id == CategoryStats.category_id)
+            .where(CategoryStats.review_count > 0)
+            .order_by(CategoryStats.average_stars.desc())
+            .limit(5)
         )
-        .join(
-            latest_reviews_subquery,
-            (latest_reviews.review_id == latest_reviews_subquery.c.review_id)
-            & (latest_reviews.created_at == latest_reviews_subquery.c.latest_created_at),
+
+        # Execute the query and fetch results without blocking the event loop
+        results = (await db.execute(query)).all()
+
+        if not results:
+            raise HTTPException(status_code=404, detail="No categories found")
+
+        # Serializing the rows directly (the average is rounded for display)
+        response = [
+            {**category._asdict(), "average_stars": round(category.average_stars, 2)}
+            for category in results
+        ]
+        return trends_adapter.dump_json(response)
+
+    return await cached_response(request, "trends", [TRENDS_GENERATION], build)
+
+
+@router.get("/trends/history", response_model=list[CategoryTrendHistory])
+async def get_review_trend_history(
+    request: Request,
+    category_id: list[int] = Query(None),
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    start: date = None,
+    end: date = None,
+    db: AsyncSession = Depends(get_async_db)):
+    """
+    Retrieves the average stars and number of ratings per category over time.
+
+    - Served from the CategoryTrendBucket rollups (one indexed range read), which the rollup task
+      keeps up to date as review versions arrive. Every version counts as a rating in the bucket it
+      was created in, so edited reviews count once per version; current per-review ratings are
+      served by /trends.
+    - Buckets are UTC days, weeks starting on Monday, or calendar months; the buckets overlapping
+      `start`..`end` are returned, and buckets without ratings are omitted.
+    - Defaults to the last DEFAULT_TREND_BUCKETS buckets up to today; at most MAX_TREND_BUCKETS
+      buckets per category are served.
+    - Logs access events through the buffered access log writer.
+    - Served from the response cache until the rollups change; supports ETag / If-None-Match.
+
+    Args:
+        request (Request): The incoming request (for conditional GET headers).
+        category_id (list[int], optional): Categories to include (repeat the parameter for several); all by default.
+        granularity (str, optional): "day" (default), "week" or "month".
+        start (date, optional): First day of the range.
+        end (date, optional): Last day of the range (inclusive); defaults to today.
+        db (AsyncSession): Async database session.
+
+    Returns:
+        List[CategoryTrendHistory]: The buckets of each category with ratings in the range, by category id.
+    """
+
+    # Logging the access (buffered and bulk-inserted in the background)
+    access_log_buffer.add(f"GET /reviews/trends/history?category_id={category_id}&granularity={granularity}")
+
+    # Resolving the date range
+    end = end or datetime.utcnow().date()
+    start = bucket_start(start, granularity) if start else buckets_before(end, granularity, DEFAULT_TREND_BUCKETS)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if bucket_count(start, end, granularity) > MAX_TREND_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TREND_BUCKETS} {granularity} buckets can be requested")
+    category_ids = sorted(set(category_id)) if category_id else None
+
+    async def build():
+        # Reading the buckets in range from the rollups (a primary key range per category)
+        query = (
+            select(
+                CategoryTrendBucket.category_id,
+                Category.name,
+                CategoryTrendBucket.bucket_start,
+                CategoryTrendBucket.stars_sum,
+                CategoryTrendBucket.rating_count,
+            )
+            .join(Category, Category.id == CategoryTrendBucket.category_id)
+            .where(
+                CategoryTrendBucket.granularity == granularity,
+                CategoryTrendBucket.bucket_start.between(start, end),
+                CategoryTrendBucket.rating_count > 0,
+            )
+            .order_by(CategoryTrendBucket.category_id, CategoryTrendBucket.bucket_start)
         )
-        .join(Category, Category.id == latest_reviews.category_id)
-        .group_by(Category.id)
-        .order_by(func.avg(latest_reviews.stars).desc())
-        .limit(5)
-    )
-    
-    # Execute the query and fetch results
-    results = query.all()
-    
-    
-    if not results:
-        raise HTTPException(status_code=404, detail="No categories found")
-    
-    # Converting results to Pydantic schema manually
-    response = [
-    {
-        "id": category.id,
-        "name": category.name,
-        "description": category.description,
-        "average_stars": round(category.average_stars, 2),
-        "total_reviews": category.total_reviews,
-    }
-    for category in results
-]
-    print(response)
-    return response
+        if category_ids:
+            query = query.where(CategoryTrendBucket.category_id.in_(category_ids))
+        rows = (await db.execute(query)).all()
+
+        if not rows:
+            raise HTTPException(status_code=404, detail="No reviews found")
+
+        # Grouping the buckets by category
+        response = [
+            {
+                "category_id": id,
+                "name": buckets[0].name,
+                "buckets": [
+                    {
+                        "bucket_start": bucket.bucket_start,
+                        "average_stars": round(bucket.stars_sum / bucket.rating_count, 2),
+                        "total_ratings": bucket.rating_count,
+                    }
+                    for bucket in buckets
+                ],
+            }
+            for id, buckets in ((id, list(group)) for id, group in groupby(rows, key=lambda row: row.category_id))
+        ]
+        return trend_history_adapter.dump_json(response)
+
+    cache_key = f"trends_history:{category_ids}:{granularity}:{start}:{end}"
+    return await cached_response(request, cache_key, [TRENDS_HISTORY_GENERATION], build)
 
 
 @router.get("/", response_model=PaginatedReviewsResponse)
 async def get_reviews_by_category(
-    category_id: int, cursor: str = None, db: Session = Depends(get_db)):
+    request: Request,
+    background_tasks: BackgroundTasks,
+    category_id: int,
+    cursor: str = None,
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)):
     
     """
     Fetches reviews for a specific category using cursor-based pagination.
     
-    - Retrieves the latest version of each review.
-    - Supports pagination with a cursor (based on `created_at` timestamp).
-    - Logs access events asynchronously.
-    - Initiates Celery tasks to calculate tone and sentiment if they are missing.
+    - Retrieves the latest version of each review (via the `is_latest` flag).
+    - Supports keyset pagination with an opaque cursor encoding `(created_at, id)`, so rows
+      sharing a timestamp are never skipped or duplicated at page boundaries.
+    - Logs access events through the buffered access log writer.
+    - Counts the view of the category after the response is sent, so the enrichment scheduler
+      fills in missing tone/sentiment of frequently viewed categories first.
+    - Served from the response cache until a review in the category is added or enriched;
+      supports ETag / If-None-Match.
 
     Args:
+        request (Request): The incoming request (for conditional GET headers).
+        background_tasks (BackgroundTasks): Work run after the response is sent.
         category_id (int): The ID of the category to fetch reviews for.
-        cursor (str, optional): ISO timestamp of the last review in the previous page.
-        db (Session): Database session.
+        cursor (str, optional): Opaque cursor returned as `next_cursor` by the previous page.
+        page_size (int, optional): Number of reviews per page (capped at MAX_PAGE_SIZE).
+        db (AsyncSession): Async database session.
 
     Returns:
         PaginatedReviewsResponse: A list of reviews and the next cursor for pagination.
     """
 
-    # Logging the access asynchronously
-    log_access_task.delay(f"GET /reviews/?category_id={category_id}")
-
-    # Defining the page size
-    page_size = 3
+    # Logging the access (buffered and bulk-inserted in the background)
+    access_log_buffer.add(f"GET /reviews/?category_id={category_id}")
+    # Feeding the enrichment priority (a Redis write, off the request path)
+    background_tasks.add_task(record_category_view, category_id)
 
-    # Subquery to get the latest `created_at` for each `review_id`
-    latest_reviews_subquery = (
-        db.query(
-            ReviewHistory.review_id,
-            func.max(ReviewHistory.created_at).label("latest_created_at"),
+    async def build():
+        # Main query: Fetching the response columns of the latest version of each review in the category
+        query = select(*REVIEW_COLUMNS).where(
+            ReviewHistory.category_id == category_id,
+            ReviewHistory.is_latest.is_(True),
         )
-        .group_by(ReviewHistory.review_id)
-        .subquery()
-    )
 
-    # Alias for ReviewHistory to join with the subquery
-    latest_reviews = aliased(ReviewHistory)
+        # Applying keyset pagination if the cursor is provided: a range seek on (created_at, id)
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(ReviewHistory.created_at, ReviewHistory.id)
+                < tuple_(literal(cursor_created_at, ReviewHistory.created_at.type), literal(cursor_id))
+            )
 
-    # Main query: Fetching reviews for the category using the latest entries
-    query = (
-        db.query(latest_reviews)
-        .join(
-            latest_reviews_subquery,
-            (latest_reviews.review_id == latest_reviews_subquery.c.review_id)
-            & (latest_reviews.created_at == latest_reviews_subquery.c.latest_created_at),
+        # Sorting reviews by `(created_at, id)` and fetching one extra row to detect a further page
+        query = query.order_by(ReviewHistory.created_at.desc(), ReviewHistory.id.desc()).limit(page_size + 1)
+        reviews = (await db.execute(query)).all()
+        has_more = len(reviews) > page_size
+        reviews = reviews[:page_size]
+
+        if not reviews:
+            raise HTTPException(status_code=404, detail="No reviews found")
+
+        # Adding the next cursor to the response if there are more results
+        next_cursor = encode_cursor(reviews[-1].created_at, reviews[-1].id) if has_more else None
+
+        # Serializing the rows directly
+        return paginated_reviews_adapter.dump_json(
+            {"reviews": [review._asdict() for review in reviews], "next_cursor": next_cursor}
         )
-        .filter(latest_reviews.category_id == category_id)
+
+    cache_key = f"reviews:{category_id}:{cursor}:{page_size}"
+    return await cached_response(request, cache_key, [category_generation(category_id)], build)
+
+
+@router.get("/search", response_model=PaginatedReviewsResponse)
+async def search_reviews(
+    q: str = Query(..., min_length=1),
+    category_id: int = None,
+    stars: int = None,
+    tone: str = None,
+    sentiment: str = None,
+    cursor: str = None,
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)):
+    """
+    Searches the text of the latest version of each review, most relevant first.
+
+    - Matches reviews containing every word of `q` (stemmed; punctuation and operators are ignored)
+      through the full-text index (FTS5 on SQLite, a GIN tsvector index on PostgreSQL).
+    - Results can be narrowed down by category, stars, tone and sentiment.
+    - Supports keyset pagination with an opaque cursor encoding `(score, id)`; relevance scores
+      depend on the whole index, so pages fetched across writes may shift slightly.
+    - Logs access events through the buffered access log writer.
+
+    Args:
+        q (str): The search query.
+        category_id (int, optional): Only reviews in this category.
+        stars (int, optional): Only reviews with this star rating.
+        tone (str, optional): Only reviews with this tone.
+        sentiment (str, optional): Only reviews with this sentiment.
+        cursor (str, optional): Opaque cursor returned as `next_cursor` by the previous page.
+        page_size (int, optional): Number of reviews per page (capped at MAX_PAGE_SIZE).
+        db (AsyncSession): Async database session.
+
+    Returns:
+        PaginatedReviewsResponse: The matching reviews and the next cursor for pagination.
+    """
+
+    # Logging the access (buffered and bulk-inserted in the background)
+    access_log_buffer.add(f"GET /reviews/search?q={q}")
+
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="The search query has no words to match")
+
+    # Ranked matches from the full-text index, resuming after the cursor if provided
+    query = search_reviews_query(
+        db.bind.dialect.name, terms, REVIEW_COLUMNS, decode_rank_cursor(cursor) if cursor else None
     )
 
-    # Applying cursor-based pagination if the cursor is provided
-    if cursor:
-        cursor_datetime = datetime.fromisoformat(cursor)
-        query = query.filter(latest_reviews.created_at < cursor_datetime)
+    # Applying the filters
+    filters = {
+        ReviewHistory.category_id: category_id,
+        ReviewHistory.stars: stars,
+        ReviewHistory.tone: tone,
+        ReviewHistory.sentiment: sentiment,
+    }
+    for column, value in filters.items():
+        if value is not None:
+            query = query.where(column == value)
 
-    # Sorting reviews by `created_at` and limit to `page_size`
-    reviews = query.order_by(latest_reviews.created_at.desc()).limit(page_size).all()
+    # Fetching one extra row to detect a further page
+    results = (await db.execute(query.limit(page_size + 1))).all()
+    has_more = len(results) > page_size
+    results = results[:page_size]
 
-    if not reviews:
+    if not results:
         raise HTTPException(status_code=404, detail="No reviews found")
 
-    # Queueing Celery tasks for missing tone/sentiment
+    # Adding the next cursor to the response if there are more results
+    next_cursor = encode_rank_cursor(results[-1].score, results[-1].id) if has_more else None
+
+    # Serializing the rows directly, without the score
+    reviews = [result._asdict() for result in results]
     for review in reviews:
-        if not review.tone and not review.sentiment:
-            # Both tone and sentiment are missing
-            llm_sentiment_prediction.delay(
-                id=review.id, missing_var="both", text=review.text, stars=review.stars
-            )
-        elif not review.tone:
-            # Only tone is missing
-            llm_sentiment_prediction.delay(
-                id=review.id, missing_var="tone", text=review.text, stars=review.stars
-            )
-        elif not review.sentiment:
-            # Only sentiment is missing
-            llm_sentiment_prediction.delay(
-                id=review.id, missing_var="sentiment", text=review.text, stars=review.stars
-            )
+        del review["score"]
+    return Response(
+        content=paginated_reviews_adapter.dump_json({"reviews": reviews, "next_cursor": next_cursor}),
+        media_type="application/json",
+    )
 
-    # Constructing the response
-    response = [ReviewSchema.model_validate(review) for review in reviews]
 
-    # Adding the next cursor to the response if there are more results
-    next_cursor = reviews[-1].created_at.isoformat() if len(reviews) == page_size else None
+@router.get("/history", response_model=list[ReviewVersion])
+async def get_review_history(review_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Retrieves every version of one review, oldest first.
+
+    - Reads the versions still in ReviewHistory and those moved to the archive (see
+      app.archival), both through their `(review_id, created_at)` indexes.
+    - Logs access events through the buffered access log writer.
+
+    Args:
+        review_id (str): The review to read.
+        db (AsyncSession): Async database session.
+
+    Returns:
+        List[ReviewVersion]: The versions of the review, flagged as latest and/or archived.
+    """
+
+    # Logging the access (buffered and bulk-inserted in the background)
+    access_log_buffer.add(f"GET /reviews/history?review_id={review_id}")
+
+    versions = (await db.execute(review_versions_query(review_id, REVIEW_COLUMNS))).all()
+
+    if not versions:
+        raise HTTPException(status_code=404, detail="No reviews found")
+
+    # Serializing the rows directly
+    return Response(
+        content=review_versions_adapter.dump_json([version._asdict() for version in versions]),
+        media_type="application/json",
+    )
+
+
+def _export_value(value):
+    # Datetimes are exported as ISO 8601 strings in both formats
+    return value.isoformat() if hasattr(value, "isoformat") else value
 
-    return {"reviews": response, "next_cursor": next_cursor}
+
+@router.get("/export")
+async def export_reviews(
+    category_id: list[int] = Query(...),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """
+    Streams the latest version of every review in one or more categories.
+
+    - Rows are read through a server-side cursor (`yield_per`) and written to the response
+      batch by batch, so memory use stays constant regardless of category size.
+    - Output is NDJSON (one JSON object per line) or CSV with a header row.
+    - Logs access events through the buffered access log writer.
+
+    Args:
+        category_id (list[int]): IDs of the categories to export (repeat the parameter for several).
+        format (str, optional): "ndjson" (default) or "csv".
+
+    Returns:
+        StreamingResponse: The exported reviews, ordered by category and creation time.
+    """
+
+    # Logging the access (buffered and bulk-inserted in the background)
+    access_log_buffer.add(f"GET /reviews/export?category_id={category_id}&format={format}")
+
+    query = (
+        select(*REVIEW_COLUMNS)
+        .where(ReviewHistory.category_id.in_(category_id), ReviewHistory.is_latest.is_(True))
+        .order_by(ReviewHistory.category_id, ReviewHistory.created_at, ReviewHistory.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    field_names = [column.key for column in REVIEW_COLUMNS]
+
+    async def stream():
+        # The session lives as long as the stream, not the request handler
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query)
+
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(field_names)
+                yield buffer.getvalue()
+
+            async for rows in result.partitions():
+                if format == "csv":
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows([[_export_value(value) for value in row] for row in rows])
+                    yield buffer.getvalue()
+                else:
+                    yield "".join(
+                        json.dumps({name: _export_value(value) for name, value in zip(field_names, row)}) + "\n"
+                        for row in rows
+                    )
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="reviews.{format}"'}
+    return StreamingResponse(stream(), media_type=media_type, headers=headers)
+
+
+@router.post("/ingest", response_model=IngestResponse)
+async def ingest_reviews(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """
+    Bulk-inserts review versions sent in the request body.
+
+    - The body is NDJSON (one ReviewVersionCreate object per line) or CSV with a header row.
+    - Versions are inserted in chunked transactions with executemany; invalid records are
+      skipped and reported.
+    - Tone/sentiment enrichment of the new latest versions is queued in batches.
+    - The body is read as it arrives and spooled (to disk beyond INGEST_SPOOL_MAX_MEMORY), so
+      large batches are not held in memory; it must be UTF-8, checked before anything is inserted.
+
+    Args:
+        request (Request): The incoming request carrying the batch.
+        format (str, optional): "ndjson" (default) or "csv".
+
+    Returns:
+        IngestResponse: Counts of inserted, rejected and enrichment-queued records, with the first errors.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=INGEST_SPOOL_MAX_MEMORY, mode="w+", encoding="utf-8", newline="")
+    try:
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            async for chunk in request.stream():
+                spool.write(decoder.decode(chunk))
+            spool.write(decoder.decode(b"", final=True))
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Request body is not valid UTF-8")
+        spool.seek(0)
+
+        records = parse_csv(spool) if format == "csv" else parse_ndjson(spool)
+        # The inserts use the synchronous engine, so they run in the threadpool
+        return await run_in_threadpool(ingest_versions, records)
+    finally:
+        spool.close()
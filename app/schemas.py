@@ -1,8 +1,9 @@
 # app/schemas.py
-from pydantic import BaseModel,ConfigDict
+from pydantic import BaseModel,ConfigDict,Field
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
+from typing_extensions import TypedDict
 
 # Schema for Category api response
 class CategorySchemaResponse(BaseModel):
@@ -63,4 +64,150 @@ class PaginatedReviewsResponse(BaseModel):
         next_cursor (Optional[str]): The cursor for the next page of results, or None if there are no more results.
     """
     reviews: List[ReviewSchema]
-    next_cursor: Optional[str]  
\ No newline at end of file
+    next_cursor: Optional[str]
+
+
+# Schema for one version in the full history of a review
+class ReviewVersion(ReviewSchema):
+    """
+    Represents one version of a review in its full history.
+
+    Attributes:
+        is_latest (bool): Whether this is the current version of the review.
+        archived (bool): Whether the version was moved to the history archive.
+    """
+    is_latest: bool
+    archived: bool
+
+
+# Schema for one bucket of the trend history
+class TrendBucket(BaseModel):
+    """
+    Represents the ratings given in a category within one time bucket.
+
+    Every review version is one rating event: a review edited twice counts three times, each
+    version in the bucket it was created in.
+
+    Attributes:
+        bucket_start (date): First day (UTC) of the bucket.
+        average_stars (float): The average star rating of the review versions created in the bucket.
+        total_ratings (int): The number of review versions (rating events) created in the bucket.
+    """
+    bucket_start: date
+    average_stars: float
+    total_ratings: int
+
+
+# Schema for the trend history api response
+class CategoryTrendHistory(BaseModel):
+    """
+    Represents the rating history of one category.
+
+    Attributes:
+        category_id (int): Unique identifier for the category.
+        name (str): Name of the category.
+        buckets (List[TrendBucket]): Buckets with at least one rating, in chronological order.
+    """
+    category_id: int
+    name: str
+    buckets: List[TrendBucket]
+
+
+# Row shapes used to serialize query results straight to JSON, without building model instances
+# or re-validating data read from the database. They mirror the response models above.
+class CategoryTrendRow(TypedDict):
+    id: int
+    name: str
+    description: Optional[str]
+    average_stars: float
+    total_reviews: int
+
+
+class ReviewRow(TypedDict):
+    id: int
+    text: Optional[str]
+    stars: int
+    review_id: str
+    tone: Optional[str]
+    sentiment: Optional[str]
+    category_id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class PaginatedReviewRows(TypedDict):
+    reviews: List[ReviewRow]
+    next_cursor: Optional[str]
+
+
+class ReviewVersionRow(ReviewRow):
+    is_latest: bool
+    archived: bool
+
+
+class TrendBucketRow(TypedDict):
+    bucket_start: date
+    average_stars: float
+    total_ratings: int
+
+
+class CategoryTrendHistoryRow(TypedDict):
+    category_id: int
+    name: str
+    buckets: List[TrendBucketRow]
+
+
+# Schema for one review version submitted to the bulk ingestion endpoint
+class ReviewVersionCreate(BaseModel):
+    """
+    Represents one review version accepted by the bulk ingestion API and CLI.
+
+    Attributes:
+        review_id (str): The identifier of the review this version belongs to.
+        text (Optional[str]): The textual content of the review.
+        stars (int): The star rating of the review (1 to 10).
+        category_id (int): The ID of the category associated with the review.
+        tone (Optional[str]): The tone of the review, if already known.
+        sentiment (Optional[str]): The sentiment of the review, if already known.
+        created_at (Optional[datetime]): When the version was created; defaults to the ingestion time.
+    """
+    review_id: str = Field(min_length=1, max_length=255)
+    text: Optional[str] = None
+    stars: int = Field(ge=1, le=10)
+    category_id: int
+    tone: Optional[str] = Field(default=None, max_length=255)
+    sentiment: Optional[str] = Field(default=None, max_length=255)
+    created_at: Optional[datetime] = None
+
+
+# Schema for a rejected ingestion record
+class IngestError(BaseModel):
+    """
+    Describes a record rejected by bulk ingestion.
+
+    Attributes:
+        line (int): 1-based line (NDJSON) or record (CSV) number in the submitted batch.
+        error (str): Why the record was rejected.
+    """
+    line: int
+    error: str
+
+
+# Schema for the bulk ingestion api response
+class IngestResponse(BaseModel):
+    """
+    Represents the outcome of a bulk ingestion.
+
+    Attributes:
+        inserted (int): Number of review versions inserted.
+        rejected (int): Number of records rejected.
+        enrichment_queued (int): Number of reviews queued for tone/sentiment enrichment.
+        enrichment_not_queued (int): Number of inserted reviews whose enrichment could not be queued
+            (the enrichment scheduler picks them up later).
+        errors (List[IngestError]): The first rejected records and their errors.
+    """
+    inserted: int
+    rejected: int
+    enrichment_queued: int
+    enrichment_not_queued: int
+    errors: List[IngestError]
@@ -0,0 +1,65 @@
+import re
+from sqlalchemy import Integer, column, func, literal_column, select, table, tuple_
+from .models import SEARCH_CONFIG, ReviewHistory
+
+# Words of a search query; every word must match, punctuation and query operators are ignored
+_TERM = re.compile(r"\w+")
+
+# The SQLite FTS5 table (see SEARCH_DDL in app.models)
+review_search = table("ReviewSearch", column("rowid", Integer))
+
+
+def search_terms(q: str) -> list:
+    """
+    Splits a search query into the words that are matched.
+    """
+    return _TERM.findall(q.lower())
+
+
+def _sqlite_matches(terms: list):
+    # Each term is quoted, so FTS5 reads it as a plain word (ANDed with the others); bm25() is lower for better matches
+    index = literal_column('"ReviewSearch"')
+    return select(
+        review_search.c.rowid.label("id"),
+        func.bm25(index).label("score"),
+    ).where(index.op("MATCH")(" ".join(f'"{term}"' for term in terms)))
+
+
+def _postgresql_matches(terms: list):
+    # The document expression must stay identical to the GIN index expression for the index to be used
+    config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+    document = func.to_tsvector(config, func.coalesce(ReviewHistory.text, literal_column("''")))
+    query = func.plainto_tsquery(config, " ".join(terms))
+    return select(
+        ReviewHistory.id.label("id"),
+        (-func.ts_rank(document, query)).label("score"),
+    ).where(ReviewHistory.is_latest.is_(True), document.op("@@")(query))
+
+
+def search_reviews_query(dialect: str, terms: list, columns: list, cursor: tuple = None):
+    """
+    Builds the query for latest review versions whose text contains every search term.
+
+    Results are ranked by relevance through the full-text index of the backend, as a `score`
+    column where lower is better (BM25 on SQLite, negated ts_rank on PostgreSQL), and ordered
+    by `(score, id)` for keyset pagination.
+
+    Args:
+        dialect (str): Database dialect name ("sqlite" or "postgresql").
+        terms (list[str]): Words to match, from `search_terms`.
+        columns (list): ReviewHistory columns to select, besides `score`.
+        cursor (tuple, optional): `(score, id)` of the last row of the previous page.
+
+    Returns:
+        Select: The query; filters, ORDER BY and LIMIT can still be added by the caller.
+    """
+    matches = (_sqlite_matches(terms) if dialect == "sqlite" else _postgresql_matches(terms)).subquery()
+    query = (
+        select(*columns, matches.c.score)
+        .select_from(matches)
+        .join(ReviewHistory, ReviewHistory.id == matches.c.id)
+        .order_by(matches.c.score, ReviewHistory.id)
+    )
+    if cursor:
+        query = query.where(tuple_(matches.c.score, ReviewHistory.id) > tuple_(*cursor))
+    return query
@@ -0,0 +1,62 @@
+# Registered names of the Celery tasks defined in app.celery_tasks
+PREDICTION_TASK = "app.celery_tasks.llm_sentiment_prediction"
+PREDICTION_BATCH_TASK = "app.celery_tasks.llm_sentiment_prediction_batch"
+SCHEDULE_ENRICHMENT_TASK = "app.celery_tasks.schedule_enrichment"
+ROLLUP_TRENDS_TASK = "app.celery_tasks.rollup_trends"
+ARCHIVE_HISTORY_TASK = "app.celery_tasks.archive_history"
+EVICT_PREDICTIONS_TASK = "app.celery_tasks.evict_prediction_cache"
+
+# Queues, one per kind of work, each consumed by its own worker pool (see app.celery_worker).
+# Access logs are not Celery work: the API buffers and bulk-inserts them itself (see app.access_log).
+ENRICHMENT_QUEUE = "enrichment"
+MAINTENANCE_QUEUE = "maintenance"
+DEFAULT_QUEUE = "celery"
+CELERY_QUEUES = [ENRICHMENT_QUEUE, MAINTENANCE_QUEUE, DEFAULT_QUEUE]
+
+# Queue of each task
+TASK_QUEUES = {
+    PREDICTION_TASK: ENRICHMENT_QUEUE,
+    PREDICTION_BATCH_TASK: ENRICHMENT_QUEUE,
+    SCHEDULE_ENRICHMENT_TASK: MAINTENANCE_QUEUE,
+    ROLLUP_TRENDS_TASK: MAINTENANCE_QUEUE,
+    ARCHIVE_HISTORY_TASK: MAINTENANCE_QUEUE,
+    EVICT_PREDICTIONS_TASK: MAINTENANCE_QUEUE,
+}
+
+# Task priorities within a queue; lower values are consumed first. The Redis transport keeps one
+# list per priority step, named "<queue><PRIORITY_SEPARATOR><step>" (the first step uses the queue name).
+PRIORITY_STEPS = [0, 3, 6, 9]
+PRIORITY_SEPARATOR = ":"
+# Enrichment users are waiting for (new reviews, most viewed categories), tasks sent without a
+# priority, and enrichment of the remaining backlog
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 3
+PRIORITY_BACKFILL = 6
+
+
+def queue_keys(queue: str) -> list:
+    """
+    Returns the Redis lists holding the waiting messages of a queue, one per priority step.
+    """
+    return [queue if step == PRIORITY_STEPS[0] else f"{queue}{PRIORITY_SEPARATOR}{step}" for step in PRIORITY_STEPS]
+
+
+def send_task(name: str, *args, priority: int = None):
+    """
+    Queues a Celery task by name.
+
+    The API only produces tasks, so it never imports the task modules (and the LLM client
+    they load); the Celery app itself is only set up on the first call. The task goes to its
+    queue in TASK_QUEUES.
+
+    Args:
+        name (str): Registered task name, e.g. PREDICTION_BATCH_TASK.
+        *args: Positional task arguments.
+        priority (int, optional): One of the PRIORITY_* values; PRIORITY_DEFAULT if omitted.
+
+    Returns:
+        AsyncResult: The queued task.
+    """
+    from .celery_app import celery
+
+    return celery.send_task(name, args=args, priority=priority)
@@ -0,0 +1,179 @@
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+from .models import NOT_ROLLED_UP, CategoryTrendBucket, ReviewHistory
+from .response_cache import mark_trend_history_changed
+
+# Versions added to the rollups per transaction
+TREND_ROLLUP_BATCH_SIZE = int(os.getenv("TREND_ROLLUP_BATCH_SIZE", "5000"))
+
+# Bucket sizes kept in CategoryTrendBucket
+GRANULARITIES = ("day", "week", "month")
+# Buckets per category returned by default, and at most, by the trend history endpoint
+DEFAULT_TREND_BUCKETS = 30
+MAX_TREND_BUCKETS = 1000
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """
+    Returns the first day of the bucket containing `day` (weeks start on Monday).
+    """
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def buckets_before(end: date, granularity: str, count: int) -> date:
+    """
+    Returns the first day of the range made of the `count` buckets ending with the one containing `end`.
+    """
+    start = bucket_start(end, granularity)
+    if granularity == "week":
+        return start - timedelta(weeks=count - 1)
+    if granularity == "month":
+        months = start.year * 12 + start.month - 1 - (count - 1)
+        return date(months // 12, months % 12 + 1, 1)
+    return start - timedelta(days=count - 1)
+
+
+def bucket_count(start: date, end: date, granularity: str) -> int:
+    """
+    Returns the number of buckets overlapping the (inclusive) date range.
+    """
+    first, last = bucket_start(start, granularity), bucket_start(end, granularity)
+    if granularity == "week":
+        return (last - first).days // 7 + 1
+    if granularity == "month":
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return (last - first).days + 1
+
+
+def roll_up_versions(session: Session, batch_size: int = TREND_ROLLUP_BATCH_SIZE) -> int:
+    """
+    Adds the oldest batch of versions not yet rolled up to the CategoryTrendBucket rows.
+
+    Each version is counted once, as a rating event in the bucket of its creation time; superseded
+    versions are not subtracted.
+
+    - Versions are claimed by flipping `rolled_up` with UPDATE ... RETURNING, so concurrent runs
+      never count a version twice, and versions committed out of id order are still picked up.
+    - Claimed versions are summed per granularity, category and bucket in memory, then existing
+      buckets are incremented and new ones inserted with one statement each (executemany).
+    - Cached trend history responses are invalidated when the session commits.
+
+    The caller is responsible for committing the session.
+
+    Args:
+        session (Session): Database session.
+        batch_size (int): Maximum number of versions to roll up.
+
+    Returns:
+        int: Number of versions claimed.
+    """
+    claimed = session.execute(
+        update(ReviewHistory)
+        .where(
+            ReviewHistory.id.in_(
+                select(ReviewHistory.id).where(NOT_ROLLED_UP).order_by(ReviewHistory.id).limit(batch_size)
+            ),
+            NOT_ROLLED_UP,
+        )
+        .values(rolled_up=True, updated_at=ReviewHistory.updated_at)
+        .returning(ReviewHistory.category_id, ReviewHistory.created_at, ReviewHistory.stars)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    # Summing the claimed versions per bucket; versions without a category are not charted
+    totals = defaultdict(lambda: [0, 0])
+    for category_id, created_at, stars in claimed:
+        if category_id is None or created_at is None:
+            continue
+        for granularity in GRANULARITIES:
+            key = (granularity, category_id, bucket_start(created_at.date(), granularity))
+            totals[key][0] += stars
+            totals[key][1] += 1
+
+    if totals:
+        _add_to_buckets(session, totals)
+        mark_trend_history_changed(session)
+    return len(claimed)
+
+
+def _add_to_buckets(session: Session, totals: dict):
+    """
+    Adds (stars_sum, rating_count) totals keyed by (granularity, category_id, bucket_start) to the buckets.
+    """
+    bucket = CategoryTrendBucket.__table__
+    existing = {
+        tuple(row)
+        for row in session.execute(
+            select(bucket.c.granularity, bucket.c.category_id, bucket.c.bucket_start).where(
+                bucket.c.category_id.in_({category_id for _, category_id, _ in totals}),
+                bucket.c.bucket_start.between(
+                    min(start for _, _, start in totals), max(start for _, _, start in totals)
+                ),
+            )
+        )
+    }
+
+    updates, inserts = [], []
+    for (granularity, category_id, start), (stars_sum, rating_count) in totals.items():
+        if (granularity, category_id, start) in existing:
+            updates.append({
+                "b_granularity": granularity,
+                "b_category_id": category_id,
+                "b_bucket_start": start,
+                "b_stars_sum": stars_sum,
+                "b_rating_count": rating_count,
+            })
+        else:
+            inserts.append({
+                "granularity": granularity,
+                "category_id": category_id,
+                "bucket_start": start,
+                "stars_sum": stars_sum,
+                "rating_count": rating_count,
+            })
+
+    if updates:
+        session.execute(
+            update(bucket)
+            .where(
+                bucket.c.granularity == bindparam("b_granularity"),
+                bucket.c.category_id == bindparam("b_category_id"),
+                bucket.c.bucket_start == bindparam("b_bucket_start"),
+            )
+            .values(
+                stars_sum=bucket.c.stars_sum + bindparam("b_stars_sum"),
+                rating_count=bucket.c.rating_count + bindparam("b_rating_count"),
+            ),
+            updates,
+        )
+    if inserts:
+        session.execute(insert(bucket), inserts)
+
+
+def roll_up_pending_versions(session: Session, batch_size: int = TREND_ROLLUP_BATCH_SIZE) -> int:
+    """
+    Rolls up every version not yet counted, committing after each batch.
+
+    Used by the periodic rollup task and, after an upgrade, to backfill existing history.
+
+    Args:
+        session (Session): Database session.
+        batch_size (int): Versions per transaction.
+
+    Returns:
+        int: Number of versions rolled up.
+    """
+    total = 0
+    while True:
+        count = roll_up_versions(session, batch_size)
+        session.commit()
+        total += count
+        if count < batch_size:
+            return total
@@ -0,0 +1,171 @@
+"""
+Synthetic review history generator for benchmarks.
+
+Creates the schema in a database and fills it with categories, reviews and review versions
+(edits). Row contents are deterministic for a given seed; timestamps are relative to the
+time of generation.
+
+Usage:
+    python -m benchmarks.generate --database-url sqlite:///./bench.db \
+        [--categories 50] [--reviews 100000] [--versions 3] [--enriched-fraction 0.9] [--seed 1]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from app.models import Base, Category, ReviewHistory
+from app.projections import rebuild_category_stats
+from app.trend_history import roll_up_pending_versions
+
+# Rows per executemany INSERT
+INSERT_BATCH_SIZE = 10000
+
+_POSITIVE = ["great", "excellent", "love", "perfect", "recommend", "comfortable", "fantastic", "helpful"]
+_NEGATIVE = ["terrible", "broken", "disappointed", "poor", "waste", "rude", "slow", "worst"]
+_NEUTRAL = [
+    "product", "delivery", "quality", "price", "size", "colour", "battery", "packaging", "service",
+    "order", "arrived", "works", "feels", "looks", "expected", "week", "month", "daily", "use",
+]
+
+
+def _review_text(rng: random.Random, stars: int) -> str:
+    # Word mix follows the rating, with some noise so a share of reviews is ambiguous
+    polar = _POSITIVE if stars >= 6 else _NEGATIVE
+    if rng.random() < 0.15:
+        polar = _NEGATIVE if polar is _POSITIVE else _POSITIVE
+    words = rng.choices(_NEUTRAL, k=rng.randint(6, 30)) + rng.choices(polar, k=rng.randint(0, 3))
+    rng.shuffle(words)
+    return " ".join(words).capitalize() + "."
+
+
+def _labels(stars: int) -> tuple:
+    # (tone, sentiment), in the capitalized labels the LLM writes
+    if stars >= 7:
+        return "Positive", "Satisfied"
+    if stars <= 4:
+        return "Negative", "Disappointed"
+    return "Neutral", "Neutral"
+
+
+def generate_dataset(
+    engine,
+    categories: int = 50,
+    reviews: int = 100000,
+    versions: int = 3,
+    enriched_fraction: float = 0.9,
+    days: int = 365,
+    seed: int = 1,
+) -> dict:
+    """
+    Creates the schema and inserts a synthetic dataset.
+
+    - Each review gets 1 to `versions` versions, created in order over the last `days` days;
+      the newest is flagged `is_latest`.
+    - Superseded versions are always enriched; latest versions keep tone/sentiment with
+      probability `enriched_fraction`, the rest are left for the enrichment pipeline.
+    - CategoryStats is rebuilt and the trend rollups are filled from the inserted rows.
+
+    Args:
+        engine (Engine): Sync engine of the (empty) target database.
+        categories (int): Number of categories.
+        reviews (int): Number of distinct reviews (review_id values).
+        versions (int): Maximum number of versions per review.
+        enriched_fraction (float): Share of latest versions with tone and sentiment set.
+        days (int): Time span the creation timestamps are spread over.
+        seed (int): Random seed.
+
+    Returns:
+        dict: Parameters and row counts of the generated dataset, with the time it took.
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow().replace(microsecond=0)
+    span = timedelta(days=days).total_seconds()
+
+    with engine.begin() as connection:
+        connection.execute(insert(Category), [
+            {"id": id, "name": f"Category {id}", "description": f"Synthetic category {id}"}
+            for id in range(1, categories + 1)
+        ])
+
+    rows, inserted = [], 0
+    for number in range(1, reviews + 1):
+        category_id = rng.randint(1, categories)
+        count = rng.randint(1, versions)
+        created_at = now - timedelta(seconds=rng.uniform(0, span))
+        for version in range(count):
+            stars = rng.randint(1, 10)
+            is_latest = version == count - 1
+            enriched = not is_latest or rng.random() < enriched_fraction
+            tone, sentiment = _labels(stars) if enriched else (None, None)
+            rows.append({
+                "review_id": f"r{number}",
+                "text": _review_text(rng, stars),
+                "stars": stars,
+                "category_id": category_id,
+                "tone": tone,
+                "sentiment": sentiment,
+                "created_at": created_at,
+                "updated_at": created_at,
+                "is_latest": is_latest,
+            })
+            # Edits follow the original within the remaining time span
+            created_at += timedelta(seconds=rng.uniform(1, max((now - created_at).total_seconds(), 2)) / 2)
+
+        if len(rows) >= INSERT_BATCH_SIZE:
+            with engine.begin() as connection:
+                connection.execute(insert(ReviewHistory.__table__), rows)
+            inserted += len(rows)
+            rows = []
+
+    if rows:
+        with engine.begin() as connection:
+            connection.execute(insert(ReviewHistory.__table__), rows)
+        inserted += len(rows)
+
+    with Session(engine) as session:
+        rebuild_category_stats(session)
+        session.commit()
+        roll_up_pending_versions(session, batch_size=INSERT_BATCH_SIZE)
+
+    return {
+        "categories": categories,
+        "reviews": reviews,
+        "max_versions": versions,
+        "versions": inserted,
+        "enriched_fraction": enriched_fraction,
+        "days": days,
+        "seed": seed,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Empty target database")
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--reviews", type=int, default=100000)
+    parser.add_argument("--versions", type=int, default=3, help="Maximum versions per review")
+    parser.add_argument("--enriched-fraction", type=float, default=0.9)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=1)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    engine = create_engine(args.database_url)
+    result = generate_dataset(
+        engine, args.categories, args.reviews, args.versions, args.enriched_fraction, args.days, args.seed
+    )
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
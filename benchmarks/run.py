@@ -0,0 +1,362 @@
+"""
+Benchmark harness for the read endpoints and the enrichment pipeline.
+
+Generates a synthetic dataset (see benchmarks.generate), then measures:
+- latency percentiles and throughput of GET /reviews/trends, GET /reviews/trends/history,
+  GET /reviews/search and of paging through GET /reviews/;
+- enrichment throughput, with the LLM replaced by a stub of fixed latency and Celery running
+  an in-process worker on the in-memory broker;
+- the query plans of the SQL statements each endpoint executes.
+
+Results are printed (and optionally written) as JSON. With --baseline, latency, throughput and
+query plans are compared against an earlier result file and the exit code is 1 on regression.
+Requests go through the ASGI app in-process, so numbers exclude network and server overhead.
+The response cache is disabled unless --cache is given, so every request reaches the database.
+
+Usage:
+    python -m benchmarks.run [--reviews 100000] [--categories 50] [--versions 3] \
+        [--requests 2000] [--concurrency 16] [--fake-redis] [--output result.json] [--baseline old.json]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Queries sent to the search endpoint (words used by benchmarks.generate, of varying frequency)
+SEARCH_QUERIES = ["battery", "great delivery", "broken", "price quality", "rude service", "perfect size"]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    dataset = parser.add_argument_group("dataset")
+    dataset.add_argument("--database-url", help="Existing generated database to reuse; a new SQLite file by default")
+    dataset.add_argument("--categories", type=int, default=50)
+    dataset.add_argument("--reviews", type=int, default=100000)
+    dataset.add_argument("--versions", type=int, default=3, help="Maximum versions per review")
+    dataset.add_argument("--enriched-fraction", type=float, default=0.98)
+    dataset.add_argument("--seed", type=int, default=1)
+
+    load = parser.add_argument_group("load")
+    load.add_argument("--requests", type=int, default=2000, help="Requests per endpoint")
+    load.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    load.add_argument("--page-size", type=int, default=20)
+    load.add_argument("--pages", type=int, default=5, help="Pages walked per category before starting over")
+    load.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+
+    enrichment = parser.add_argument_group("enrichment")
+    enrichment.add_argument("--enrichment-workers", type=int, default=4, help="Worker threads consuming the queue")
+    enrichment.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per stubbed model call")
+    enrichment.add_argument("--classifier", default="cascade", choices=["cascade", "lexicon", "llm"])
+    enrichment.add_argument("--enrichment-timeout", type=float, default=600)
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--fake-redis", action="store_true", help="Use an in-process fakeredis instead of REDIS_URL")
+    output.add_argument("--output", help="Also write the JSON result to this file")
+    output.add_argument("--baseline", help="Earlier result file to compare against")
+    output.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before a regression")
+    return parser
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Nearest-rank percentile of an ascending list.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+def summarize(latencies: list, errors: int, seconds: float, concurrency: int) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / seconds, 1) if seconds else 0.0,
+    }
+
+
+async def _run_load(client, next_path, requests: int, concurrency: int) -> dict:
+    """
+    Issues `requests` GETs from `concurrency` clients; `next_path(state, response)` yields each client's next path.
+    """
+    latencies, errors = [], 0
+    remaining = requests
+
+    async def worker(index: int):
+        nonlocal remaining, errors
+        state = {"rng": random.Random(index)}
+        response = None
+        while remaining > 0:
+            remaining -= 1
+            path = next_path(state, response)
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400 and response.status_code != 404:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started, concurrency)
+
+
+def _page_walker(categories: int, page_size: int, pages: int):
+    def next_path(state, response):
+        # Follows next_cursor for up to `pages` pages, then starts over in another category
+        cursor = None
+        if response is not None and response.status_code == 200 and state.get("depth", 0) < pages:
+            cursor = response.json().get("next_cursor")
+        if cursor is None:
+            state["category"] = state["rng"].randint(1, categories)
+            state["depth"] = 1
+            return f"/reviews/?category_id={state['category']}&page_size={page_size}"
+        state["depth"] += 1
+        return f"/reviews/?category_id={state['category']}&page_size={page_size}&cursor={cursor}"
+
+    return next_path
+
+
+@contextmanager
+def capture_statements(engine):
+    """
+    Collects the SELECT statements (with parameters) executed through a sync engine.
+    """
+    from sqlalchemy import event
+
+    statements = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+
+
+def explain(engine, statements: list) -> list:
+    """
+    Returns the query plan of each captured statement.
+    """
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    plans = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            rows = connection.exec_driver_sql(prefix + statement, parameters).all()
+            plans.append({"statement": " ".join(statement.split()), "plan": [str(row[-1]) for row in rows]})
+    return plans
+
+
+async def bench_endpoints(args) -> dict:
+    import httpx
+    from app.database import async_engine, engine
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        cases = {
+            "trends": lambda state, response: "/reviews/trends",
+            "trends_history": lambda state, response: (
+                f"/reviews/trends/history?category_id={state['rng'].randint(1, args.categories)}&granularity=week"
+            ),
+            "search": lambda state, response: (
+                f"/reviews/search?q={state['rng'].choice(SEARCH_QUERIES)}&page_size={args.page_size}"
+            ),
+            "reviews_page": _page_walker(args.categories, args.page_size, args.pages),
+        }
+        for name, next_path in cases.items():
+            # One request outside the measurement to record the statements and their plans
+            with capture_statements(async_engine.sync_engine) as statements:
+                await client.get(next_path({"rng": random.Random(0)}, None))
+            plans = explain(engine, statements)
+
+            # Warm-up, then the measured run
+            await _run_load(client, next_path, min(args.requests // 10, 200), args.concurrency)
+            results[name] = await _run_load(client, next_path, args.requests, args.concurrency)
+            results[name]["query_plans"] = plans
+    return results
+
+
+class StubChain:
+    """
+    Stands in for the LLM chain: answers every prompt after a fixed delay.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def ainvoke(self, input, **kwargs):
+        await asyncio.sleep(self.latency)
+        return '{"tone": "Neutral", "sentiment": "Neutral"}'
+
+
+def bench_enrichment(args) -> dict:
+    """
+    Enriches every unenriched latest version through the real scheduler, tasks and classifier,
+    with a stubbed model and an in-process Celery worker on the in-memory broker.
+    """
+    from celery.contrib.testing.worker import start_worker
+    from sqlalchemy import func, select
+    from app import classifiers
+    from app.celery_app import celery
+    from app.database import SessionLocal
+    from app.enrichment import ENRICHMENT_MAX_IN_FLIGHT, schedule_enrichment_batches
+    from app.metrics import CLASSIFIER_ESCALATIONS, CLASSIFIER_PREDICTIONS
+    from app.models import UNENRICHED, ReviewHistory
+    from app.pending import pending_count
+    from app.task_signatures import ENRICHMENT_QUEUE
+    import app.celery_tasks  # noqa: F401  (registers the tasks)
+
+    # The in-memory transport polls for messages; poll often so the harness does not add latency
+    celery.conf.update(
+        broker_url="memory://",
+        result_backend="cache+memory://",
+        broker_transport_options={**celery.conf.broker_transport_options, "polling_interval": 0.01},
+    )
+    classifiers._chain = StubChain(args.llm_latency)
+
+    def unenriched() -> int:
+        with SessionLocal() as db:
+            return db.execute(select(func.count()).select_from(ReviewHistory).where(UNENRICHED)).scalar()
+
+    total = unenriched()
+    predictions_before = CLASSIFIER_PREDICTIONS.values()
+    escalations_before = CLASSIFIER_ESCALATIONS.values()
+
+    started = time.perf_counter()
+    with start_worker(
+        celery, pool="threads", concurrency=args.enrichment_workers, perform_ping_check=False, loglevel="WARNING",
+        queues=[ENRICHMENT_QUEUE],
+    ):
+        remaining = total
+        while remaining and time.perf_counter() - started < args.enrichment_timeout:
+            with SessionLocal() as db:
+                schedule_enrichment_batches(db, ENRICHMENT_MAX_IN_FLIGHT)
+            time.sleep(0.05)
+            remaining = unenriched()
+        while pending_count() and time.perf_counter() - started < args.enrichment_timeout:
+            time.sleep(0.05)
+    seconds = time.perf_counter() - started
+
+    def delta(after: dict, before: dict) -> dict:
+        return {labels[0]: after[labels] - before.get(labels, 0) for labels in after}
+
+    return {
+        "classifier": args.classifier,
+        "llm_latency_s": args.llm_latency,
+        "workers": args.enrichment_workers,
+        "reviews": total - remaining,
+        "unfinished": remaining,
+        "seconds": round(seconds, 3),
+        "reviews_per_second": round((total - remaining) / seconds, 1) if seconds else 0.0,
+        "predictions_by_backend": delta(CLASSIFIER_PREDICTIONS.values(), predictions_before),
+        "escalations": delta(CLASSIFIER_ESCALATIONS.values(), escalations_before),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Lists regressions of `result` against `baseline`: slower p99 latency, lower throughput,
+    or changed query plans.
+    """
+    regressions = []
+    for name in ("trends", "trends_history", "search", "reviews_page"):
+        new, old = result["endpoints"].get(name), baseline.get("endpoints", {}).get(name)
+        if not new or not old:
+            continue
+        if new["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {old['p99_ms']}ms -> {new['p99_ms']}ms")
+        if new["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {old['throughput_rps']} -> {new['throughput_rps']} req/s")
+        if [plan["plan"] for plan in new["query_plans"]] != [plan["plan"] for plan in old["query_plans"]]:
+            regressions.append(f"{name}: query plan changed")
+
+    new, old = result.get("enrichment"), baseline.get("enrichment")
+    if new and old and new["reviews_per_second"] < old["reviews_per_second"] * (1 - tolerance):
+        regressions.append(
+            f"enrichment: {old['reviews_per_second']} -> {new['reviews_per_second']} reviews/s"
+        )
+    return regressions
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    workdir = None
+    if not args.database_url:
+        workdir = tempfile.mkdtemp(prefix="reviews-bench-")
+        args.database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    # The app reads its configuration from the environment at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DB_CREATE_ALL"] = "false"
+    os.environ["CLASSIFIER_BACKEND"] = args.classifier
+    if not args.cache:
+        os.environ["RESPONSE_CACHE_BACKEND"] = "memory"
+        os.environ["RESPONSE_CACHE_TTL"] = "0"
+
+    if args.fake_redis:
+        import fakeredis
+        import app.pending
+
+        app.pending._client = fakeredis.FakeRedis()
+
+    from sqlalchemy import create_engine
+    from benchmarks.generate import generate_dataset
+
+    dataset = None
+    if workdir:
+        dataset = generate_dataset(
+            create_engine(args.database_url), args.categories, args.reviews, args.versions,
+            args.enriched_fraction, seed=args.seed,
+        )
+
+    result = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlite": sqlite3.sqlite_version,
+            "database_url": args.database_url,
+            "response_cache": args.cache,
+        },
+        "dataset": dataset,
+        "endpoints": asyncio.run(bench_endpoints(args)),
+        "enrichment": bench_enrichment(args),
+    }
+
+    from app.access_log import access_log_buffer
+
+    access_log_buffer.close()
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            result["regressions"] = compare(result, json.load(file), args.tolerance)
+        exit_code = 1 if result["regressions"] else 0
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
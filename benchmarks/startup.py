@@ -0,0 +1,73 @@
+"""
+Startup benchmark: measures how long importing the API (`app.main`) takes in a fresh interpreter.
+
+Fails (exit code 1) when the median import time exceeds the budget, or when the API process
+loads modules it should only load lazily (the LLM client and the Celery worker code).
+
+Usage:
+    python benchmarks/startup.py [--runs 7] [--budget-ms 1500]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Median import time allowed for `import app.main`, in milliseconds
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+# Modules that only worker processes need; importing the API must not load them
+LAZY_MODULES = ["langchain_core", "langchain_ollama", "celery", "app.celery_tasks", "app.classifiers"]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def measure_import(lazy_modules: list) -> dict:
+    """
+    Imports app.main in a new interpreter and returns the elapsed time and which lazy modules got loaded.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE % (lazy_modules,)],
+        cwd=REPO_ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters to measure")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="Maximum median import time")
+    args = parser.parse_args(argv)
+
+    samples = [measure_import(LAZY_MODULES) for _ in range(args.runs)]
+    times = sorted(sample["ms"] for sample in samples)
+    loaded = sorted({module for sample in samples for module in sample["loaded"]})
+    median = statistics.median(times)
+
+    result = {
+        "runs": args.runs,
+        "median_ms": round(median, 1),
+        "min_ms": round(times[0], 1),
+        "max_ms": round(times[-1], 1),
+        "budget_ms": args.budget_ms,
+        "eagerly_loaded": loaded,
+        "passed": median <= args.budget_ms and not loaded,
+    }
+    print(json.dumps(result, indent=2))
+    return 0 if result["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
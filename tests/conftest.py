@@ -0,0 +1,43 @@
+import fakeredis
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import app.metrics
+import app.pending
+import app.projections  # noqa: F401  (registers the session hooks)
+from app.models import Base, Category
+
+
+@pytest.fixture(autouse=True)
+def redis_client(monkeypatch):
+    """
+    Replaces the shared Redis client (claims, circuit breaker, cache generations, metrics) with fakeredis.
+    """
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(app.pending, "_client", client)
+    yield client
+    # Writing the buffered shared metrics before the real client is restored
+    app.metrics._shared_buffer.flush()
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    Returns a session factory bound to a fresh SQLite database file with two categories.
+
+    The file (rather than an in-memory database) lets tests open concurrent sessions.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(autoflush=False, bind=engine)
+    with factory() as db:
+        db.add_all([Category(name="Books"), Category(name="Games")])
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import pytest
+from app import classifiers
+from app.classifiers import LLMClassifier
+
+
+class LoopBoundChain:
+    """
+    Stands in for the LLM chain; like its HTTP client, it only works on the event loop of its first call.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+
+    async def ainvoke(self, input, **kwargs):
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        elif self.loop is not loop:
+            raise RuntimeError("Event loop is closed")
+        self.calls += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return '{"tone": "Positive", "sentiment": "Happy"}'
+
+
+class ClosedCircuit:
+    """
+    Stands in for the Redis-backed LLM circuit breaker, always closed.
+    """
+
+    failures = 0
+
+    def is_open(self):
+        return False
+
+    def record_success(self):
+        pass
+
+    def record_failure(self):
+        self.failures += 1
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    chain = LoopBoundChain()
+    monkeypatch.setattr(classifiers, "_chain", chain)
+    monkeypatch.setattr(classifiers, "llm_circuit", ClosedCircuit())
+    monkeypatch.setattr(classifiers, "_record", lambda *args, **kwargs: None)
+    classifiers.run_coroutine(asyncio.sleep(0))  # starts the process loop
+    monkeypatch.setattr(classifiers, "_model_slots", asyncio.Semaphore(2))
+    return chain
+
+
+def test_classify_batch_twice_reuses_the_event_loop(chain):
+    classifier = LLMClassifier()
+    items = [("both", "Great", 9), ("both", "Lovely", 8)]
+
+    first = classifier.classify_batch(items)
+    second = classifier.classify_batch(items)
+
+    expected = ({"tone": "Positive", "sentiment": "Happy"}, 1.0, "llm")
+    assert first == [expected, expected]
+    assert second == [expected, expected]
+    assert chain.calls == 4
+    assert classifiers.llm_circuit.failures == 0
+
+
+def test_classify_after_classify_batch_reuses_the_event_loop(chain):
+    classifier = LLMClassifier()
+
+    classifier.classify_batch([("both", "Great", 9)])
+
+    assert classifier.classify("both", "Great", 9) == ({"tone": "Positive", "sentiment": "Happy"}, 1.0, "llm")
+
+
+def test_concurrent_tasks_share_the_process_concurrency_limit(chain):
+    classifier = LLMClassifier()
+    items = [("both", "Great", 9)] * 3
+    # Like a thread-pool worker running tasks side by side, single-review ones included
+    threads = [threading.Thread(target=classifier.classify_batch, args=(items,)) for _ in range(3)]
+    threads += [threading.Thread(target=classifier.classify, args=items[0]) for _ in range(3)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert chain.calls == 12
+    assert chain.max_running == 2
@@ -0,0 +1,37 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routers import reviews
+
+
+@pytest.fixture
+def client(monkeypatch):
+    received = []
+
+    def ingest_versions(records):
+        received.extend(records)
+        return {"inserted": len(received), "rejected": 0, "enrichment_queued": 0, "enrichment_not_queued": 0, "errors": []}
+
+    monkeypatch.setattr(reviews, "ingest_versions", ingest_versions)
+    client = TestClient(app)
+    client.received = received
+    return client
+
+
+def test_body_is_parsed_line_by_line(client, monkeypatch):
+    # A tiny spool threshold makes the body go through a temporary file
+    monkeypatch.setattr(reviews, "INGEST_SPOOL_MAX_MEMORY", 16)
+    lines = [{"review_id": f"r{number}", "text": "Très bien", "stars": 8, "category_id": 1} for number in range(3)]
+
+    response = client.post("/reviews/ingest", content="\n".join(json.dumps(line, ensure_ascii=False) for line in lines).encode())
+
+    assert response.status_code == 200
+    assert client.received == list(enumerate(lines, 1))
+
+
+def test_non_utf8_body_is_rejected(client):
+    response = client.post("/reviews/ingest?format=csv", content="review_id,text\nr,Très bien\n".encode("latin-1"))
+
+    assert response.status_code == 400
+    assert client.received == []
@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import select
+from app import ingestion
+from app.models import ReviewHistory
+from app.projections import verify_category_stats
+
+
+@pytest.fixture
+def ingest(session_factory, monkeypatch):
+    monkeypatch.setattr(ingestion, "SessionLocal", session_factory)
+    monkeypatch.setattr(ingestion, "dispatch_enrichment", lambda ids: len(ids))
+
+    def ingest(records, chunk_size=ingestion.INGEST_CHUNK_SIZE):
+        return ingestion.ingest_versions(list(enumerate(records, 1)), chunk_size)
+
+    return ingest
+
+
+def versions(db, review_id):
+    return db.execute(
+        select(ReviewHistory.created_at, ReviewHistory.stars, ReviewHistory.is_latest)
+        .where(ReviewHistory.review_id == review_id)
+        .order_by(ReviewHistory.id)
+    ).all()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2])
+def test_sub_second_versions_compare_at_stored_precision(ingest, db, chunk_size):
+    # SQLite stores whole seconds: both versions read back as 12:00:00, so the one written last wins
+    # whether the two arrive in one chunk or in separate ones
+    ingest([
+        {"review_id": "r", "stars": 7, "category_id": 1, "created_at": "2024-01-01T12:00:00.700"},
+        {"review_id": "r", "stars": 3, "category_id": 1, "created_at": "2024-01-01T12:00:00.300"},
+    ], chunk_size)
+
+    rows = versions(db, "r")
+    assert [row.created_at.isoformat() for row in rows] == ["2024-01-01T12:00:00"] * 2
+    assert [row.is_latest for row in rows] == [False, True]
+    assert verify_category_stats(db) == []
+
+
+def test_older_version_in_an_earlier_second_is_back_filled(ingest, db):
+    ingest([{"review_id": "r", "stars": 7, "category_id": 1, "created_at": "2024-01-01T12:00:01.200"}])
+    ingest([{"review_id": "r", "stars": 3, "category_id": 1, "created_at": "2024-01-01T12:00:00.900"}])
+
+    assert [(row.stars, row.is_latest) for row in versions(db, "r")] == [(7, True), (3, False)]
+    assert verify_category_stats(db) == []
+
+
+def test_rejected_records_name_the_invalid_fields(ingest):
+    result = ingest([{"review_id": "r", "stars": 11}])
+
+    assert result["rejected"] == 1
+    assert result["errors"][0]["error"] == (
+        "stars: Input should be less than or equal to 10; category_id: Field required"
+    )
+
+
+def test_rows_stay_inserted_when_enrichment_cannot_be_queued(ingest, db, monkeypatch):
+    def broker_down(ids):
+        raise ConnectionError("broker unavailable")
+
+    monkeypatch.setattr(ingestion, "dispatch_enrichment", broker_down)
+    result = ingest([{"review_id": "r", "stars": 7, "category_id": 1}])
+
+    assert (result["inserted"], result["enrichment_queued"], result["enrichment_not_queued"]) == (1, 0, 1)
+    assert len(versions(db, "r")) == 1
@@ -0,0 +1,30 @@
+from app import metrics
+from app.metrics import PREDICTION_CACHE_LOOKUPS
+
+
+def test_shared_increments_are_written_in_one_flush(redis_client):
+    buffer = metrics._SharedBuffer()
+    buffer.add("metrics:test_total", {"a": 1})
+    buffer.add("metrics:test_total", {"a": 2, "b": 1})
+    buffer.add("metrics:other_total", {"c": 1})
+
+    # Recording does not touch Redis
+    assert redis_client.hgetall("metrics:test_total") == {}
+    assert buffer.pending("metrics:test_total") == {"a": 3, "b": 1}
+
+    buffer.flush()
+
+    assert redis_client.hgetall("metrics:test_total") == {b"a": b"3", b"b": b"1"}
+    assert redis_client.hgetall("metrics:other_total") == {b"c": b"1"}
+    assert buffer.pending("metrics:test_total") == {}
+
+
+def test_shared_counter_reads_include_unwritten_increments(monkeypatch):
+    monkeypatch.setattr(metrics, "_shared_buffer", metrics._SharedBuffer())
+    before = PREDICTION_CACHE_LOOKUPS.values().get(("hit",), 0)
+
+    PREDICTION_CACHE_LOOKUPS.inc(2, result="hit")
+    assert PREDICTION_CACHE_LOOKUPS.values()[("hit",)] == before + 2
+
+    metrics._shared_buffer.flush()
+    assert PREDICTION_CACHE_LOOKUPS.values()[("hit",)] == before + 2
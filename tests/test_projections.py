@@ -0,0 +1,180 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.sql.dml import Update
+from app.models import CategoryStats, ReviewHistory
+from app.projections import LatestVersionConflict, apply_bulk_versions, commit_versions, verify_category_stats
+
+
+def at(minute: int) -> datetime:
+    return datetime(2024, 1, 1, 12, minute)
+
+
+def version(review_id: str, stars: int, minute: int, category_id: int = 1) -> dict:
+    return {
+        "review_id": review_id,
+        "text": f"{review_id} at {minute}",
+        "stars": stars,
+        "category_id": category_id,
+        "created_at": at(minute),
+        "updated_at": at(minute),
+    }
+
+
+def add_versions(db, *versions):
+    # ORM path: the before_flush hook maintains the projections
+    db.add_all([ReviewHistory(**values) for values in versions])
+    db.commit()
+
+
+def add_chunk(db, *versions):
+    # Bulk path, as in app.ingestion
+    rows = [dict(values) for values in versions]
+    apply_bulk_versions(db, rows)
+    db.execute(insert(ReviewHistory.__table__), rows)
+    db.commit()
+
+
+def latest(db) -> dict:
+    return {
+        row.review_id: (row.stars, row.category_id)
+        for row in db.execute(select(ReviewHistory.review_id, ReviewHistory.stars, ReviewHistory.category_id).where(
+            ReviewHistory.is_latest.is_(True)
+        ))
+    }
+
+
+def assert_consistent(db):
+    # Exactly one latest version per review, and CategoryStats matching a full recomputation
+    counts = db.execute(
+        select(ReviewHistory.review_id, func.count())
+        .where(ReviewHistory.is_latest.is_(True))
+        .group_by(ReviewHistory.review_id)
+    ).all()
+    reviews = db.execute(select(func.count(ReviewHistory.review_id.distinct()))).scalar_one()
+    assert len(counts) == reviews
+    assert all(count == 1 for _, count in counts)
+    assert verify_category_stats(db) == []
+
+
+def stats(db) -> dict:
+    return {
+        row.category_id: (row.stars_sum, row.review_count)
+        for row in db.execute(select(CategoryStats.category_id, CategoryStats.stars_sum, CategoryStats.review_count))
+    }
+
+
+@pytest.mark.parametrize("add", [add_versions, add_chunk])
+def test_newer_versions_supersede_the_latest(db, add):
+    add(db, version("a", 4, 0), version("b", 6, 0))
+    add(db, version("a", 8, 1))
+
+    assert latest(db) == {"a": (8, 1), "b": (6, 1)}
+    assert stats(db) == {1: (14, 2)}
+    assert_consistent(db)
+
+
+@pytest.mark.parametrize("add", [add_versions, add_chunk])
+def test_several_versions_of_a_review_in_one_flush(db, add):
+    add(db, version("a", 4, 2), version("a", 9, 3), version("a", 1, 1))
+
+    assert latest(db) == {"a": (9, 1)}
+    assert stats(db) == {1: (9, 1)}
+    assert_consistent(db)
+
+
+@pytest.mark.parametrize("add", [add_versions, add_chunk])
+def test_back_filled_older_version_stays_superseded(db, add):
+    add(db, version("a", 8, 5))
+    add(db, version("a", 2, 1))
+
+    assert latest(db) == {"a": (8, 1)}
+    assert stats(db) == {1: (8, 1)}
+    assert_consistent(db)
+
+
+@pytest.mark.parametrize("add", [add_versions, add_chunk])
+def test_category_move_updates_both_categories(db, add):
+    add(db, version("a", 8, 0, category_id=1), version("b", 4, 0, category_id=1))
+    add(db, version("a", 6, 1, category_id=2))
+
+    assert latest(db) == {"a": (6, 2), "b": (4, 1)}
+    assert stats(db) == {1: (4, 1), 2: (6, 1)}
+    assert_consistent(db)
+
+
+def test_orm_and_bulk_writes_mix(db):
+    add_chunk(db, *[version(f"r{i}", i % 10 + 1, 0, category_id=i % 2 + 1) for i in range(20)])
+    add_versions(db, *[version(f"r{i}", 10, 1, category_id=1) for i in range(0, 20, 3)])
+    add_chunk(db, *[version(f"r{i}", 1, 2, category_id=2) for i in range(0, 20, 4)])
+    add_versions(db, *[version(f"r{i}", 5, 0) for i in range(0, 20, 5)])
+
+    assert len(latest(db)) == 20
+    assert_consistent(db)
+
+
+def race(db, session_factory, monkeypatch, *versions):
+    """
+    Makes another session commit the given versions right before the first UPDATE run by db, i.e.
+    after db has read the current latest versions and before it writes anything.
+    """
+    execute = db.execute
+    raced = []
+
+    def execute_after_race(statement, *args, **kwargs):
+        if not raced and isinstance(statement, Update):
+            raced.append(statement)
+            with session_factory() as other:
+                add_versions(other, *versions)
+        return execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(db, "execute", execute_after_race)
+    return raced
+
+
+def test_orm_write_retried_after_concurrent_demotion(db, session_factory, monkeypatch):
+    add_versions(db, version("a", 4, 0))
+    # Demoting the 12:00 version fails: the concurrent 12:01 version already superseded it
+    raced = race(db, session_factory, monkeypatch, version("a", 6, 1, category_id=2))
+    attempts = []
+
+    def write(session):
+        attempts.append(len(attempts) + 1)
+        session.add(ReviewHistory(**version("a", 9, 2)))
+
+    commit_versions(db, write)
+
+    assert raced and attempts == [1, 2]
+    assert latest(db) == {"a": (9, 1)}
+    assert stats(db) == {1: (9, 1), 2: (0, 0)}
+    assert_consistent(db)
+
+
+def test_bulk_write_retried_after_concurrent_first_version(db, session_factory, monkeypatch):
+    # Both writers see no latest version; the loser's insert violates the unique latest index
+    raced = race(db, session_factory, monkeypatch, version("a", 6, 0))
+    attempts = []
+
+    def write(session):
+        attempts.append(len(attempts) + 1)
+        rows = [version("a", 9, 1)]
+        apply_bulk_versions(session, rows)
+        session.execute(insert(ReviewHistory.__table__), rows)
+
+    commit_versions(db, write)
+
+    assert raced and attempts == [1, 2]
+    assert latest(db) == {"a": (9, 1)}
+    assert_consistent(db)
+
+
+def test_conflict_raised_once_attempts_run_out(db, session_factory, monkeypatch):
+    add_versions(db, version("a", 4, 0))
+    race(db, session_factory, monkeypatch, version("a", 6, 1))
+
+    with pytest.raises(LatestVersionConflict):
+        commit_versions(db, lambda session: session.add(ReviewHistory(**version("a", 9, 2))), attempts=1)
+
+    db.rollback()
+    assert latest(db) == {"a": (6, 1)}
+    assert_consistent(db)
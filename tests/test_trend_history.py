@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import select
+from app.models import CategoryTrendBucket, ReviewHistory
+from app.trend_history import roll_up_pending_versions
+
+
+def test_every_version_counts_as_a_rating_in_its_own_bucket(db):
+    db.add_all([
+        ReviewHistory(review_id="a", stars=2, category_id=1, created_at=datetime(2024, 1, 1, 9)),
+        ReviewHistory(review_id="b", stars=6, category_id=1, created_at=datetime(2024, 1, 1, 10)),
+    ])
+    db.commit()
+    # Editing review "a" the next day: the superseded rating stays counted on January 1
+    db.add(ReviewHistory(review_id="a", stars=10, category_id=1, created_at=datetime(2024, 1, 2, 9)))
+    db.commit()
+
+    assert roll_up_pending_versions(db) == 3
+
+    buckets = db.execute(
+        select(CategoryTrendBucket.bucket_start, CategoryTrendBucket.stars_sum, CategoryTrendBucket.rating_count)
+        .where(CategoryTrendBucket.granularity == "day")
+        .order_by(CategoryTrendBucket.bucket_start)
+    ).all()
+    assert [(row.bucket_start.isoformat(), row.stars_sum, row.rating_count) for row in buckets] == [
+        ("2024-01-01", 8, 2),
+        ("2024-01-02", 10, 1),
+    ]
+    month = db.execute(
+        select(CategoryTrendBucket.stars_sum, CategoryTrendBucket.rating_count)
+        .where(CategoryTrendBucket.granularity == "month")
+    ).one()
+    assert tuple(month) == (18, 3)